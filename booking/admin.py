@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ArchivedAppointment, CapacityLimit, OutboxMessage, UploadedArt
+
+
+@admin.register(UploadedArt)
+class UploadedArtAdmin(admin.ModelAdmin):
+    list_display = ('client_name', 'date_uploaded')
+
+
+@admin.register(CapacityLimit)
+class CapacityLimitAdmin(admin.ModelAdmin):
+    list_display = ('date', 'artstyle', 'max_bookings')
+
+
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(admin.ModelAdmin):
+    list_display = ('fullname', 'artstyle', 'date', 'status', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('fullname', 'email', 'contact')
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
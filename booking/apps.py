@@ -7,3 +7,4 @@ class BookingConfig(AppConfig):
 
     def ready(self):
         import booking.models  # ensure signals are registered
+        import booking.tasks  # register background job handlers
@@ -0,0 +1,173 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage, storages
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import capacity, conditional
+from .images import derivative_names
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================
+# POLICY
+# ===============================
+def due_for_archival(now=None):
+    """Appointments past settings.ARCHIVE_AFTER_DAYS for their status."""
+    from .models import Appointment
+
+    now = now or timezone.now()
+    policy = Q(pk__in=[])
+    for status, days in settings.ARCHIVE_AFTER_DAYS.items():
+        cutoff = now - timedelta(days=days)
+        policy |= Q(status=status, created_at__lt=cutoff, date__lt=cutoff.date())
+    return Appointment.objects.filter(policy)
+
+
+# ===============================
+# MEDIA
+# ===============================
+def relocate(name, moved):
+    """
+    Copy one hot file into archive storage and return its archive name.
+
+    Blob names are content hashes, so a file already under the archive
+    prefix is the same bytes and is not uploaded again. `moved` memoises
+    names within a run (many bookings share a blob).
+    """
+    if name in moved:
+        return moved[name]
+    archive = storages['archive']
+    target = settings.ARCHIVE_MEDIA_PREFIX + name
+    if not archive.exists(target):
+        try:
+            with default_storage.open(name, 'rb') as source:
+                target = archive.save(target, source)
+        except FileNotFoundError:
+            logger.warning("Archiving: %s is missing from media storage", name)
+            target = ''
+    moved[name] = target
+    return target
+
+
+def release_hot_files(names, derivatives=()):
+    """
+    Drop hot copies of archived images that nothing else still uses.
+
+    `names` has one entry per archived reference. Tracked blobs are released
+    through the refcount (gallery entries hold their own references);
+    untracked legacy names are deleted only when no live row points at them.
+    `derivatives` are the archived rows' thumbnails, released through the
+    refcount only: untracked legacy thumbnails stay.
+    """
+    from .models import Appointment, StoredBlob, UploadedArt
+
+    tracked = set(
+        StoredBlob.objects.filter(name__in=set(names) | set(derivatives)).values_list('name', flat=True)
+    )
+    untracked = set(names) - tracked
+    in_use = set()
+    if untracked:
+        for model, fields in ((Appointment, Appointment.IMAGE_FIELDS), (UploadedArt, UploadedArt.IMAGE_FIELDS)):
+            for field in fields:
+                in_use.update(model.objects.filter(**{f"{field}__in": untracked}).values_list(field, flat=True))
+
+    for name in names:
+        if name in tracked:
+            default_storage.delete(name)
+    for name in untracked - in_use:
+        default_storage.delete(name)
+    for name in derivatives:
+        if name in tracked:
+            default_storage.delete(name)
+
+
+# ===============================
+# ARCHIVAL
+# ===============================
+def archive_batch(ids, now=None, moved=None):
+    """
+    Move the given appointments (re-checked against the policy) to
+    ArchivedAppointment. Returns how many rows moved.
+
+    Rows are locked while their media is copied, then inserted into the
+    archive and deleted from the hot table in the same transaction; hot
+    files are released after commit.
+    """
+    from .models import Appointment, ArchivedAppointment, UploadedArt, batch_delete
+
+    moved = {} if moved is None else moved
+    hot_files, hot_derivatives = [], []
+    with transaction.atomic():
+        appointments = list(due_for_archival(now).select_for_update().filter(pk__in=ids))
+        if not appointments:
+            return 0
+
+        # A promoted gallery entry shows its booking's thumbnails without
+        # holding a reference; it inherits the booking's one instead
+        entries = UploadedArt.objects.filter(appointment__in=appointments)
+        shown = {
+            name
+            for derivatives in entries.values_list('derivatives', flat=True)
+            for name in derivative_names(derivatives)
+        }
+        archived = []
+        for appointment in appointments:
+            hot_derivatives += [name for name in derivative_names(appointment.derivatives) if name not in shown]
+            media = {}
+            for field in Appointment.IMAGE_FIELDS:
+                fieldfile = getattr(appointment, field)
+                media[field] = relocate(fieldfile.name, moved) if fieldfile else ''
+                if fieldfile:
+                    hot_files.append(fieldfile.name)
+            archived.append(ArchivedAppointment(
+                id=appointment.pk,
+                user_id=appointment.user_id,
+                fullname=appointment.fullname,
+                email=appointment.email,
+                contact=appointment.contact,
+                date=appointment.date,
+                artstyle=appointment.artstyle,
+                status=appointment.status,
+                created_at=appointment.created_at,
+                payment_phash=appointment.payment_phash,
+                **media,
+            ))
+
+        # ignore_conflicts: a previous run may have died between insert and delete
+        ArchivedAppointment.objects.bulk_create(archived, ignore_conflicts=True)
+        with batch_delete():
+            Appointment.objects.filter(pk__in=[a.pk for a in appointments]).delete()
+        # What the muted post_delete receivers would have done, once per batch
+        user_ids = {a.user_id for a in appointments}
+        capacity.release_many(appointments)
+        conditional.bump('admin', *(conditional.user_scope(pk) for pk in user_ids))
+        transaction.on_commit(lambda: release_hot_files(hot_files, hot_derivatives))
+    return len(appointments)
+
+
+# ===============================
+# READ PATH
+# ===============================
+def get_appointment(pk):
+    """The booking with this id, hot or archived (or None)."""
+    from .models import Appointment, ArchivedAppointment
+
+    return (
+        Appointment.objects.filter(pk=pk).first()
+        or ArchivedAppointment.objects.filter(pk=pk).first()
+    )
+
+
+def latest_for_user(user):
+    """Most recent booking of `user`, falling back to the archive."""
+    from .models import Appointment, ArchivedAppointment
+
+    return (
+        Appointment.objects.filter(user=user).order_by('-created_at').first()
+        or ArchivedAppointment.objects.filter(user=user).order_by('-created_at').first()
+    )
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .caching import get_cached_user
+
+UserModel = get_user_model()
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Log in with either the username or the email address.
+
+    The user is resolved with one case-insensitive query (backed by the
+    UPPER(username)/UPPER(email) indexes) and the password is hashed exactly
+    once; unknown users still pay one hash so timing doesn't leak accounts.
+
+    get_user() (run by AuthenticationMiddleware on every request) is served
+    from the cache; see booking.caching.get_cached_user.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+
+        user = (
+            UserModel._default_manager
+            .filter(Q(username__iexact=username) | Q(email__iexact=username))
+            # An exact username hit wins over someone else's email address.
+            .order_by(Case(
+                When(username__iexact=username, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ), 'pk')
+            .first()
+        )
+        if user is None:
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id, super().get_user)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+
+_MISSING = object()
+
+
+# ===============================
+# LATEST BOOKING PER USER
+# ===============================
+def latest_booking_key(user_id, version):
+    return f"booking:latest:{user_id}:v{version}"
+
+
+def _user_version(request):
+    """The PageVersion counter of the user's scope, read once per request."""
+    from . import conditional
+
+    scope = conditional.user_scope(request.user.pk)
+    known = getattr(request, '_page_versions', None) or {}
+    if scope not in known:
+        known = {**known, scope: conditional.versions([scope]).get(scope, (0,))[0]}
+        request._page_versions = known
+    return known[scope]
+
+
+def get_latest_booking(request):
+    """
+    The user's most recent Appointment (or None), archived ones included.
+
+    Memoised on the request so the context processor and the view share
+    one lookup. Between requests it is cached under the user's PageVersion
+    counter, which every write to their bookings bumps in the database, so
+    an instance never serves a booking another instance has since changed.
+    """
+    if not request.user.is_authenticated:
+        return None
+
+    memo = getattr(request, '_latest_booking', _MISSING)
+    if memo is not _MISSING:
+        return memo
+
+    key = latest_booking_key(request.user.pk, _user_version(request))
+    booking = cache.get(key, _MISSING)
+    if booking is _MISSING:
+        from .archive import latest_for_user
+        booking = latest_for_user(request.user)
+        cache.set(key, booking, settings.LATEST_BOOKING_CACHE_TIMEOUT)
+
+    request._latest_booking = booking
+    return booking
+
+
+# ===============================
+# AUTHENTICATED USER
+# ===============================
+def user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_cached_user(user_id, load):
+    """
+    The user with this pk, from the shared cache for up to
+    USER_CACHE_TIMEOUT seconds; `load(user_id)` fetches it on a miss.
+    Unknown users are not cached.
+    """
+    key = user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = load(user_id)
+        if user is not None:
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    if user_id is not None:
+        cache.delete(user_key(user_id))
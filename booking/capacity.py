@@ -0,0 +1,139 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+# Statuses that occupy a slot; Denied bookings free theirs.
+COUNTED_STATUSES = ('Pending', 'Accepted')
+
+
+class CapacityFull(Exception):
+    pass
+
+
+def slot_of(appointment):
+    """(date, artstyle) the booking occupies, or None if it doesn't count."""
+    if appointment.get_deferred_fields() & {'date', 'artstyle', 'status'}:
+        return None
+    if appointment.status not in COUNTED_STATUSES or not appointment.date:
+        return None
+    return (appointment.date, appointment.artstyle)
+
+
+# ===============================
+# LIMITS
+# ===============================
+def limits_for(dates, artstyle=None):
+    """
+    {date: {'': day_limit, artstyle: style_limit}} for the given dates.
+    Missing keys mean "no limit" for that style.
+    """
+    from .models import CapacityLimit
+
+    rows = CapacityLimit.objects.filter(Q(date__isnull=True) | Q(date__in=dates))
+    if artstyle is not None:
+        rows = rows.filter(artstyle__in=['', artstyle])
+
+    defaults = {'': settings.BOOKING_DAILY_LIMIT} if settings.BOOKING_DAILY_LIMIT else {}
+    overrides = {}
+    for row in rows:
+        target = defaults if row.date is None else overrides.setdefault(row.date, {})
+        target[row.artstyle] = row.max_bookings
+    return {day: {**defaults, **overrides.get(day, {})} for day in dates}
+
+
+def counts_for(dates, artstyle=None):
+    from .models import DailyBookingCount
+
+    rows = DailyBookingCount.objects.filter(date__in=dates)
+    if artstyle is not None:
+        rows = rows.filter(artstyle__in=['', artstyle])
+    counts = {day: {} for day in dates}
+    for day, style, count in rows.values_list('date', 'artstyle', 'count'):
+        counts[day][style] = count
+    return counts
+
+
+def is_available(date, artstyle):
+    """Whether one more booking fits; reads at most two counter rows."""
+    limits = limits_for([date], artstyle)[date]
+    counts = counts_for([date], artstyle)[date]
+    return all(counts.get(key, 0) < limits[key] for key in ('', artstyle) if key in limits)
+
+
+# ===============================
+# COUNTERS
+# ===============================
+def _counter(date, artstyle):
+    from .models import DailyBookingCount
+
+    try:
+        with transaction.atomic():
+            DailyBookingCount.objects.get_or_create(date=date, artstyle=artstyle)
+    except IntegrityError:
+        pass  # created concurrently
+    return DailyBookingCount.objects.filter(date=date, artstyle=artstyle)
+
+
+def reserve(date, artstyle, enforce=False):
+    """
+    Count one booking on (date, artstyle) and on the day total.
+
+    With enforce=True the increment is conditional on the configured limits
+    and CapacityFull is raised instead; callers run this inside the booking's
+    transaction so the insert rolls back with it.
+    """
+    limits = limits_for([date], artstyle)[date] if enforce else {}
+    for key in ('', artstyle):
+        counter = _counter(date, key)
+        if key in limits:
+            counter = counter.filter(count__lt=limits[key])
+        if not counter.update(count=F('count') + 1, updated_at=timezone.now()):
+            raise CapacityFull(f"{date} is fully booked" + (f" for {artstyle}" if key else ""))
+
+
+def release(date, artstyle, amount=1):
+    from .models import DailyBookingCount
+
+    DailyBookingCount.objects.filter(date=date, artstyle__in=['', artstyle], count__gte=amount).update(
+        count=F('count') - amount, updated_at=timezone.now()
+    )
+
+
+def release_many(appointments):
+    """Free the slots of bookings changed via queryset.update() (no signals)."""
+    per_style = Counter(slot for slot in map(slot_of, appointments) if slot)
+    for (date, artstyle), amount in per_style.items():
+        release(date, artstyle, amount)
+
+
+def rebuild_counts():
+    """Recompute every counter from the Appointment table (repair tool)."""
+    from .models import Appointment, DailyBookingCount
+
+    counted = Appointment.objects.filter(status__in=COUNTED_STATUSES)
+    rows = [
+        DailyBookingCount(date=r['date'], artstyle=r['artstyle'], count=r['n'])
+        for r in counted.values('date', 'artstyle').annotate(n=Count('id'))
+    ] + [
+        DailyBookingCount(date=r['date'], artstyle='', count=r['n'])
+        for r in counted.values('date').annotate(n=Count('id'))
+    ]
+    with transaction.atomic():
+        DailyBookingCount.objects.all().delete()
+        DailyBookingCount.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def version(dates):
+    """Cheap fingerprint of counts + limits for a date range (used as an ETag)."""
+    from .models import CapacityLimit, DailyBookingCount
+
+    counts = DailyBookingCount.objects.filter(date__in=dates).aggregate(changed=Max('updated_at'), n=Count('id'))
+    limits = CapacityLimit.objects.aggregate(changed=Max('updated_at'), n=Count('id'))
+    return (
+        f"{counts['changed']}:{counts['n']}|{limits['changed']}:{limits['n']}"
+        f"|{settings.BOOKING_DAILY_LIMIT}"
+    )
@@ -0,0 +1,106 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+# ===============================
+# VERSION COUNTERS
+# ===============================
+def user_scope(user_id):
+    return f"user:{user_id}" if user_id is not None else None
+
+
+def bump(*scopes):
+    """
+    Mark pages of these scopes as changed, once the current transaction
+    commits (rolled-back writes change nothing, and the hot 'admin' row is
+    not held locked for the rest of a booking transaction).
+    """
+    scopes = [scope for scope in scopes if scope]
+    if scopes:
+        transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def _bump_now(scopes):
+    from .models import PageVersion
+
+    now = timezone.now()
+    changed = PageVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1, updated_at=now)
+    if changed < len(scopes):
+        PageVersion.objects.bulk_create(
+            [PageVersion(scope=scope, updated_at=now) for scope in scopes],
+            ignore_conflicts=True,
+        )
+
+
+def versions(scopes):
+    """{scope: (version, updated_at)} for the scopes that have changed at least once."""
+    from .models import PageVersion
+
+    return {
+        scope: (version, updated_at)
+        for scope, version, updated_at in PageVersion.objects.filter(scope__in=scopes)
+        .values_list('scope', 'version', 'updated_at')
+    }
+
+
+# ===============================
+# CONDITIONAL GET
+# ===============================
+def _page_state(request, name, scopes, shows_messages):
+    """(etag, last_modified) for this request, or (None, None) to always render."""
+    memo = getattr(request, '_page_state', None)
+    if memo is not None:
+        return memo
+
+    state = (None, None)
+    # A 304 would hide flash messages the page is about to display
+    if not (shows_messages and len(messages.get_messages(request))):
+        scopes = [user_scope(request.user.pk) if scope == 'user' else scope for scope in scopes]
+        scopes = [scope for scope in scopes if scope]
+        current = versions(scopes)
+        # Shared with caching.get_latest_booking, which keys on the user scope
+        request._page_versions = {scope: current.get(scope, (0,))[0] for scope in scopes}
+        key = '|'.join([
+            name,
+            request.get_full_path(),
+            str(request.user.pk),
+            # The page embeds the CSRF token; a rotated token must re-render it
+            request.META.get('CSRF_COOKIE', ''),
+            settings.PAGE_VERSION_SALT,
+            *(f"{scope}:{current.get(scope, (0,))[0]}" for scope in scopes),
+        ])
+        changed = [updated_at for _, updated_at in current.values()]
+        state = (hashlib.md5(key.encode()).hexdigest(), max(changed) if changed else None)
+    request._page_state = state
+    return state
+
+
+def conditional_page(name, scopes, shows_messages=False):
+    """
+    Answer repeat GETs of a page with 304 Not Modified while none of its
+    scopes changed, without running the view. `scopes` may include 'user'
+    for the signed-in user's own scope. Apply below @login_required.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: _page_state(request, name, scopes, shows_messages)[0],
+            last_modified_func=lambda request, *args, **kwargs: _page_state(request, name, scopes, shows_messages)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                # Revalidate every time instead of heuristic caching off Last-Modified
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,9 +1,10 @@
-from .models import Appointment
+from functools import partial
+
+from .caching import get_latest_booking
 
 def latest_booking_context(request):
-    """Makes latest booking available to all templates automatically."""
-    if request.user.is_authenticated:
-        latest_booking = Appointment.objects.filter(user=request.user).order_by('-created_at').first()
-    else:
-        latest_booking = None
-    return {'latest_booking': latest_booking}
+    """Makes latest booking available to all templates automatically.
+
+    Passed as a callable so templates that never use it cost no query.
+    """
+    return {'latest_booking': partial(get_latest_booking, request)}
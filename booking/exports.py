@@ -0,0 +1,123 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Column order of the export, per kind
+FIELDS = {
+    'appointments': ('id', 'fullname', 'email', 'contact', 'date', 'artstyle', 'status', 'created_at', 'archived'),
+    'gallery': ('id', 'appointment_id', 'client_name', 'contact', 'date_uploaded', 'art', 'reference'),
+}
+
+
+class InvalidFilters(ValueError):
+    """The export filters did not validate; carries the form errors."""
+
+
+# ===============================
+# QUERYSETS
+# ===============================
+def filtered_queryset(kind, params):
+    """
+    Rows of `kind` matching the dashboard filters in `params` (status,
+    artstyle, date_from, date_to, archived). Gallery entries only honour
+    the date range, applied to their upload date.
+    """
+    from .forms import DashboardFilterForm
+    from .models import Appointment, UploadedArt
+
+    form = DashboardFilterForm(params)
+    if not form.is_valid():
+        raise InvalidFilters(form.errors.as_text())
+    if kind == 'appointments':
+        return form.filter(Appointment.objects.all())
+
+    queryset = UploadedArt.objects.all()
+    if form.cleaned_data['date_from']:
+        queryset = queryset.filter(date_uploaded__date__gte=form.cleaned_data['date_from'])
+    if form.cleaned_data['date_to']:
+        queryset = queryset.filter(date_uploaded__date__lte=form.cleaned_data['date_to'])
+    return queryset
+
+
+def iter_rows(queryset, fields, chunk_size=None):
+    """
+    Yield each matching row as a dict of `fields`, oldest first, holding at
+    most one chunk in memory.
+
+    iterator() streams from a server-side cursor on Postgres. Behind a
+    transaction-mode pooler those are disabled (DB_POOL_MODE=pgbouncer) and
+    the driver would buffer the whole result, so rows are then fetched in
+    keyset batches on the primary key instead.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    model = queryset.model
+    columns = [field for field in fields if field != 'archived']
+    extra = {'archived': model.archived} if 'archived' in fields else {}
+    queryset = queryset.order_by('pk').values(*columns)
+
+    db = connections[queryset.db]
+    if db.vendor == 'postgresql' and db.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        last = None
+        while True:
+            batch = queryset if last is None else queryset.filter(pk__gt=last)
+            batch = list(batch[:chunk_size])
+            for row in batch:
+                yield {**row, **extra}
+            if len(batch) < chunk_size:
+                return
+            last = batch[-1]['id']
+    else:
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield {**row, **extra}
+
+
+def export_rows(kind, params, chunk_size=None):
+    """Filtered rows of `kind`; for appointments archived=on reads the archive."""
+    return iter_rows(filtered_queryset(kind, params), FIELDS[kind], chunk_size)
+
+
+# ===============================
+# SERIALISATION
+# ===============================
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+# Leading characters a spreadsheet would evaluate as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def spreadsheet_safe(value):
+    """Quote text a spreadsheet would run as a formula (=, +, -, @, tab, CR)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.DictWriter(_Echo(), fieldnames=fields)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow({key: spreadsheet_safe(value) for key, value in row.items()})
+
+
+def jsonl_lines(rows, fields=None):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def serialise(kind, fmt, rows):
+    """Lines of text for `rows` in `fmt` ('csv' or 'jsonl')."""
+    lines = csv_lines if fmt == 'csv' else jsonl_lines
+    return lines(rows, FIELDS[kind])
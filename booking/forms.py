@@ -1,5 +1,8 @@
 from django import forms
-from .models import Appointment
+from django.conf import settings
+from . import capacity
+from .images import normalize_upload
+from .models import Appointment, ArchivedAppointment
 
 class AppointmentForm(forms.ModelForm):
     class Meta:
@@ -7,4 +10,53 @@ class AppointmentForm(forms.ModelForm):
         fields = ['fullname', 'email', 'contact', 'date', 'artstyle', 'art_image', 'payment_reference']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
-        }
\ No newline at end of file
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date, artstyle = cleaned_data.get('date'), cleaned_data.get('artstyle')
+        if date and artstyle and not capacity.is_available(date, artstyle):
+            self.add_error('date', "Sorry, that date is fully booked. Please pick another day.")
+        return cleaned_data
+
+    def save(self, commit=True):
+        # Re-checked atomically when the booking row is inserted
+        self.instance.enforce_capacity = True
+        # Shrink and re-encode fresh uploads before they reach storage
+        for field, options in settings.IMAGE_INGEST.items():
+            fieldfile = getattr(self.instance, field)
+            if fieldfile and not fieldfile._committed:
+                setattr(self.instance, field, normalize_upload(fieldfile.file, **options))
+        return super().save(commit)
+
+
+class DashboardFilterForm(forms.Form):
+    """Server-side filters for the admin dashboard (all optional)."""
+    status = forms.ChoiceField(
+        choices=[('', 'All statuses')] + Appointment.STATUS_CHOICES,
+        required=False,
+    )
+    artstyle = forms.ChoiceField(
+        choices=[('', 'All art styles')] + [(style, style) for style in Appointment.ART_STYLES],
+        required=False,
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    archived = forms.BooleanField(required=False, label="Archived")
+
+    def filter(self, queryset):
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data['archived']:
+            # Same field names, so every other filter applies unchanged
+            queryset = ArchivedAppointment.objects.all()
+        if data['status']:
+            queryset = queryset.filter(status=data['status'])
+        if data['artstyle']:
+            queryset = queryset.filter(artstyle=data['artstyle'])
+        if data['date_from']:
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if data['date_to']:
+            queryset = queryset.filter(date__lte=data['date_to'])
+        return queryset
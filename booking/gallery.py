@@ -0,0 +1,76 @@
+from . import conditional
+from .models import UploadedArt
+from .storage import retain_shared_files
+
+# Appointment image field -> UploadedArt image field
+FIELD_MAP = {
+    'art_image': 'art',
+    'payment_reference': 'reference',
+}
+
+
+def entry_fields(appointment):
+    """UploadedArt values for an appointment, pointing at its stored blobs."""
+    derivatives = appointment.derivatives or {}
+    return {
+        'client_name': appointment.fullname,
+        'contact': appointment.contact,
+        'art': appointment.art_image,
+        'reference': appointment.payment_reference,
+        'derivatives': {
+            target: derivatives[source]
+            for source, target in FIELD_MAP.items()
+            if source in derivatives
+        },
+    }
+
+
+def promote(appointment):
+    """
+    The gallery entry for one accepted appointment, created if missing.
+
+    Call inside a transaction that holds the appointment row lock
+    (select_for_update) so concurrent promotions queue up behind it; the
+    unique appointment FK backs this up. Returns (entry, created).
+    """
+    if not (appointment.art_image or appointment.payment_reference):
+        return None, False
+    entry, created = UploadedArt.objects.get_or_create(
+        appointment=appointment, defaults=entry_fields(appointment),
+    )
+    if created:
+        # Shares the appointment's blobs: record the references, upload nothing
+        retain_shared_files([entry.art, entry.reference])
+    return entry, created
+
+
+def promote_to_gallery(appointments, backdated=False):
+    """
+    Create UploadedArt rows for accepted appointments in one bulk insert.
+
+    Bulk variant of promote() with the same locking requirement.
+    Appointments without images, or already in the gallery, are skipped.
+    `backdated` dates each entry at its booking's created_at (imports; the
+    caller must lift auto_now_add). Returns the created rows.
+    """
+    candidates = [a for a in appointments if a.art_image or a.payment_reference]
+    if not candidates:
+        return []
+
+    existing = set(
+        UploadedArt.objects.filter(appointment__in=candidates).values_list('appointment_id', flat=True)
+    )
+    entries = [
+        UploadedArt(
+            appointment=appointment,
+            **entry_fields(appointment),
+            **({'date_uploaded': appointment.created_at} if backdated else {}),
+        )
+        for appointment in candidates
+        if appointment.pk not in existing
+    ]
+    created = UploadedArt.objects.bulk_create(entries)
+    retain_shared_files(f for entry in created for f in (entry.art, entry.reference))
+    if created:
+        conditional.bump('admin')
+    return created
@@ -0,0 +1,181 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+
+def writable_format(fmt):
+    """`fmt` if this Pillow build can write it (WebP may be missing), JPEG otherwise."""
+    fmt = fmt.upper()
+    if fmt == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return fmt
+
+
+def extension_for(fmt):
+    return 'jpg' if fmt == 'JPEG' else fmt.lower()
+
+
+def encode(image, fmt, quality):
+    """Encode a Pillow image; metadata (EXIF, text chunks) is never carried over."""
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif fmt in ('WEBP', 'AVIF') and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    out = BytesIO()
+    image.save(out, fmt, quality=quality, optimize=True)
+    return out.getvalue()
+
+
+# ===============================
+# INGEST NORMALIZATION
+# ===============================
+def normalize_upload(upload, max_dimension, fmt, quality):
+    """
+    Downsize an uploaded image to fit `max_dimension`, drop its metadata
+    and re-encode it. Returns a ContentFile named after the original,
+    carrying the sha256 of the new bytes for ContentAddressedStorage.
+    """
+    fmt = writable_format(fmt)
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # JPEG can decode straight at a reduced scale, saving most of the RAM.
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension))
+        data = encode(image, fmt, quality)
+
+    stem, _ = os.path.splitext(os.path.basename(upload.name))
+    normalized = ContentFile(data, name=f"{stem}.{extension_for(fmt)}")
+    normalized.sha256 = hashlib.sha256(data).hexdigest()
+    return normalized
+
+
+# ===============================
+# RESPONSIVE DERIVATIVES
+# ===============================
+def derivative_format():
+    return writable_format(settings.IMAGE_DERIVATIVE_FORMAT)
+
+
+def derivative_name(source_name, label, fmt):
+    """references/shot.png -> references/shot_thumb.webp (next to the original)."""
+    stem, _ = os.path.splitext(source_name)
+    return f"{stem}_{label}.{extension_for(fmt)}"
+
+
+def render_derivative(image, width, fmt):
+    """Return encoded bytes of `image` scaled down to at most `width` pixels wide."""
+    copy = image.copy()
+    copy.thumbnail((width, width * 4))
+    return encode(copy, fmt, settings.IMAGE_DERIVATIVE_QUALITY)
+
+
+def build_derivatives(fieldfile, source=None):
+    """
+    Create every configured size for one ImageField value.
+
+    `source` may be the file object that was just uploaded so we don't have
+    to download it back from remote storage. Returns the dict stored in the
+    model's `derivatives` column: {'source': name, 'thumb': name, ...}.
+    """
+    storage = fieldfile.storage
+    fmt = derivative_format()
+    result = {'source': fieldfile.name}
+    # No exists() probe: content-addressed names can't be predicted before
+    # encoding, and promoted gallery entries copy their appointment's names.
+    # Identical bytes are deduplicated by the storage itself.
+    if source is None:
+        source = fieldfile.open('rb')
+    source.seek(0)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        for label, width in settings.IMAGE_DERIVATIVES.items():
+            content = ContentFile(render_derivative(image, width, fmt))
+            result[label] = storage.save(derivative_name(fieldfile.name, label, fmt), content)
+    source.seek(0)
+    return result
+
+
+def derivatives_for(instance, field_name):
+    """Stored derivative names for `field_name`, or None if stale/missing."""
+    fieldfile = getattr(instance, field_name)
+    entry = (instance.derivatives or {}).get(field_name)
+    if not fieldfile or not entry or entry.get('source') != fieldfile.name:
+        return None
+    return entry
+
+
+def derivative_names(derivatives):
+    """Stored derivative names in a `derivatives` value ({field: entry}), originals excluded."""
+    return [
+        name
+        for entry in (derivatives or {}).values()
+        for label, name in entry.items() if label != 'source'
+    ]
+
+
+# ===============================
+# PERCEPTUAL HASHES
+# ===============================
+def perceptual_hash(source):
+    """
+    64-bit difference hash (dHash) of an image file: one bit per adjacent
+    pixel pair of a 9x8 greyscale thumbnail, so re-encoded, resized or
+    lightly cropped copies of a screenshot land a few bits apart. Returned
+    signed to fit a BigIntegerField; None if the file is not an image.
+    """
+    source.seek(0)
+    try:
+        with Image.open(source) as image:
+            image.draft('L', (64, 64))
+            small = ImageOps.exif_transpose(image).convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    except OSError:
+        return None
+    finally:
+        source.seek(0)
+
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits - (1 << 64) if bits >= 1 << 63 else bits
+
+
+# ===============================
+# STATIC IMAGE VARIANTS (collectstatic)
+# ===============================
+def variant_name(name, width, fmt):
+    """images/pet.jpg -> images/pet.480w.webp"""
+    stem, _ = os.path.splitext(name)
+    return f"{stem}.{width}w.{extension_for(fmt)}"
+
+
+def render_static_variants(name, source):
+    """
+    Yield (variant name, bytes) for one static image: each format of
+    STATIC_IMAGE_FORMATS this Pillow build can write, at every width of
+    STATIC_IMAGE_WIDTHS narrower than the original, plus the original width
+    when that is below the largest configured one (never upscaled).
+    """
+    formats = {
+        fmt.upper(): quality for fmt, quality in settings.STATIC_IMAGE_FORMATS.items()
+        if features.check(fmt.lower())
+    }
+    if not formats:
+        return
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    widths = [w for w in settings.STATIC_IMAGE_WIDTHS if w < image.width]
+    if image.width < max(settings.STATIC_IMAGE_WIDTHS):
+        widths.append(image.width)
+    for width in widths:
+        copy = image.copy()
+        copy.thumbnail((width, image.height))
+        for fmt, quality in formats.items():
+            yield variant_name(name, width, fmt), encode(copy, fmt, quality)
@@ -0,0 +1,328 @@
+import csv
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime, time
+
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .images import perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+
+class RowError(ValueError):
+    """A source row that cannot be imported (reported and skipped)."""
+
+
+# ===============================
+# SOURCE FILES
+# ===============================
+def read_rows(path, fmt=None):
+    """Yield each record of a CSV or JSONL file as a dict, in file order."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as source:
+        if fmt == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                try:
+                    yield json.loads(line) if line.strip() else {}
+                except json.JSONDecodeError:
+                    yield None   # parse_row reports it; keeps row numbers aligned
+
+
+class Checkpoint:
+    """
+    Number of source rows already handled, kept next to the input file and
+    replaced atomically after each committed batch.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.rows_done = 0
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            if state.get('source') == self.source:
+                self.rows_done = state['rows_done']
+        return self.rows_done
+
+    def save(self, rows_done):
+        self.rows_done = rows_done
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'source': self.source, 'rows_done': rows_done}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ===============================
+# ROW PARSING
+# ===============================
+def _value(row, name):
+    return str(row.get(name) or '').strip()
+
+
+def _timestamp(value):
+    """Parse an ISO date or datetime; naive values are in TIME_ZONE."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise RowError(f"bad timestamp {value!r}")
+        parsed = datetime.combine(day, time())
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def parse_row(row, image_dir):
+    """
+    Validate one source record and return a plain dict ready for
+    write_batch(). `kind` is 'appointment' (default) or 'gallery' for a
+    finished piece with no booking behind it. Image columns hold paths
+    relative to `image_dir`.
+    """
+    from .models import Appointment
+
+    if not isinstance(row, dict):
+        raise RowError("not a JSON object")
+    kind = _value(row, 'kind') or 'appointment'
+    images = {}
+    fields = ('art_image', 'payment_reference') if kind == 'appointment' else ('art', 'reference')
+    for field in fields:
+        name = _value(row, field)
+        if name:
+            path = os.path.join(image_dir, name)
+            if not os.path.isfile(path):
+                raise RowError(f"{field}: no such file {path}")
+            images[field] = path
+
+    if kind == 'gallery':
+        client_name = _value(row, 'client_name') or _value(row, 'fullname')
+        if not client_name:
+            raise RowError("client_name is required")
+        return {
+            'kind': kind,
+            'client_name': client_name[:100],
+            'contact': _value(row, 'contact')[:20] or None,
+            'date_uploaded': _timestamp(_value(row, 'date_uploaded') or _value(row, 'created_at')),
+            'images': images,
+        }
+    if kind != 'appointment':
+        raise RowError(f"unknown kind {kind!r}")
+
+    email = _value(row, 'email').lower()
+    day = parse_date(_value(row, 'date'))
+    status = _value(row, 'status') or 'Pending'
+    if not email or '@' not in email:
+        raise RowError("email is required")
+    if day is None:
+        raise RowError(f"bad date {_value(row, 'date')!r}")
+    if status not in dict(Appointment.STATUS_CHOICES):
+        raise RowError(f"unknown status {status!r}")
+    for name in ('fullname', 'contact', 'artstyle'):
+        if not _value(row, name):
+            raise RowError(f"{name} is required")
+    return {
+        'kind': kind,
+        'username': _value(row, 'username') or email,
+        'fullname': _value(row, 'fullname')[:100],
+        'email': email,
+        'contact': _value(row, 'contact')[:20],
+        'date': day,
+        'artstyle': _value(row, 'artstyle')[:100],
+        'status': status,
+        'created_at': _timestamp(_value(row, 'created_at')),
+        'images': images,
+    }
+
+
+def drop_existing(records):
+    """
+    Records not already in the database, so re-running a batch (a crash
+    between commit and checkpoint, or --restart) creates no duplicates.
+    """
+    from .models import Appointment, UploadedArt
+
+    bookings = [r for r in records if r['kind'] == 'appointment']
+    pieces = [r for r in records if r['kind'] == 'gallery' and r['date_uploaded']]
+    seen = set()
+    if bookings:
+        seen.update(
+            ('appointment', email.lower(), *rest) for email, *rest in Appointment.objects.annotate(
+                email_upper=Upper('email'),
+            ).filter(
+                email_upper__in={r['email'].upper() for r in bookings}, date__in={r['date'] for r in bookings},
+            ).values_list('email', 'date', 'fullname', 'artstyle')
+        )
+    if pieces:
+        seen.update(
+            ('gallery', *key) for key in UploadedArt.objects.filter(
+                client_name__in={r['client_name'] for r in pieces},
+                date_uploaded__in={r['date_uploaded'] for r in pieces},
+            ).values_list('client_name', 'date_uploaded')
+        )
+
+    def key(r):
+        if r['kind'] == 'appointment':
+            return ('appointment', r['email'], r['date'], r['fullname'], r['artstyle'])
+        return ('gallery', r['client_name'], r['date_uploaded'])
+
+    return [r for r in records if key(r) not in seen]
+
+
+# ===============================
+# IMAGES
+# ===============================
+def _upload(field, path, hashed):
+    """
+    Store one source image under the field's upload_to; runs in a worker.
+    Returns (stored name, perceptual hash if `hashed` else None).
+    """
+    try:
+        with open(path, 'rb') as source:
+            phash = perceptual_hash(source) if hashed else None
+            name = field.generate_filename(None, os.path.basename(path))
+            return field.storage.save(name, File(source, name=os.path.basename(path))), phash
+    finally:
+        # Worker threads get their own DB connections (StoredBlob rows)
+        connections.close_all()
+
+
+def upload_images(records, pool):
+    """
+    Upload every image of `records` through the worker pool and replace the
+    paths with stored names (perceptual hashes go to record['hashes']).
+    Each reference is saved separately so the content-addressed storage
+    counts it. On failure everything stored for the batch is released and
+    the error re-raised.
+    """
+    from .models import Appointment, UploadedArt
+
+    jobs = []
+    for record in records:
+        model = Appointment if record['kind'] == 'appointment' else UploadedArt
+        hashes = getattr(model, 'PHASH_FIELDS', {})
+        record['hashes'] = {target: None for target in hashes.values()}
+        for field_name, path in record['images'].items():
+            field = model._meta.get_field(field_name)
+            future = pool.submit(_upload, field, path, field_name in hashes)
+            jobs.append((record, field_name, field, hashes.get(field_name), future))
+
+    stored, error = [], None
+    for record, field_name, field, hash_field, future in jobs:
+        try:
+            record['images'][field_name], phash = future.result()
+            stored.append((field.storage, record['images'][field_name]))
+            if hash_field:
+                record['hashes'][hash_field] = phash
+        except Exception as exc:
+            error = error or exc
+    if error is not None:
+        release(stored)
+        raise error
+    return stored
+
+
+def release(stored):
+    from .uploads import discard
+
+    for storage, name in stored:
+        discard(storage, [name])
+
+
+# ===============================
+# WRITES
+# ===============================
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep our backdated values instead of auto_now_add's now()."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def _users_for(records):
+    """email -> CustomUser, creating customers (unusable password) as needed."""
+    from django.contrib.auth.hashers import make_password
+
+    from .models import CustomUser
+
+    def by_email(emails):
+        # Case-insensitive like login (email__iexact), on the Upper('email') index
+        matches = CustomUser.objects.annotate(email_upper=Upper('email')).filter(
+            email_upper__in={email.upper() for email in emails}
+        )
+        return {u.email.lower(): u for u in matches}
+
+    users = by_email({r['email'] for r in records})
+    missing = {r['email']: r for r in records if r['email'] not in users}
+    if missing:
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                username=r['username'][:150], email=email, first_name=r['fullname'].split(' ')[0][:150],
+                password=make_password(None), role='customer',
+            )
+            for email, r in missing.items()
+        ], ignore_conflicts=True)
+        users.update(by_email(missing))
+    return users
+
+
+def write_batch(records, promote=True):
+    """
+    Insert one batch of parsed records (images already uploaded) in a single
+    transaction. Accepted bookings get their gallery entry, dated like the
+    booking, when `promote`.
+    Returns (appointments, gallery entries) created.
+    """
+    from . import gallery
+    from .models import Appointment, UploadedArt
+
+    bookings = [r for r in records if r['kind'] == 'appointment']
+    pieces = [r for r in records if r['kind'] == 'gallery']
+    now = timezone.now()
+    timestamps = (Appointment._meta.get_field('created_at'), UploadedArt._meta.get_field('date_uploaded'))
+    with transaction.atomic(), explicit_timestamps(*timestamps):
+        users = _users_for(bookings)
+        unmatched = [r['email'] for r in bookings if r['email'] not in users]
+        if unmatched:
+            raise RowError(f"could not create users for {', '.join(sorted(set(unmatched)))} (username taken?)")
+
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                user=users[r['email']], fullname=r['fullname'], email=r['email'], contact=r['contact'],
+                date=r['date'], artstyle=r['artstyle'], status=r['status'],
+                created_at=r['created_at'] or now, **r['images'], **r['hashes'],
+            )
+            for r in bookings
+        ])
+        entries = UploadedArt.objects.bulk_create([
+            UploadedArt(
+                client_name=r['client_name'], contact=r['contact'],
+                date_uploaded=r['date_uploaded'] or now, **r['images'],
+            )
+            for r in pieces
+        ])
+        if promote:
+            accepted = [a for a in appointments if a.status == 'Accepted']
+            entries += gallery.promote_to_gallery(accepted, backdated=True)
+    return appointments, entries
@@ -0,0 +1,111 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as a job handler: @task('promote_to_gallery')."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Queue `task_name` to run in the worker.
+
+    With an idempotency `key` the same logical job is only ever queued once;
+    re-enqueueing returns the existing row.
+    """
+    from .models import Job
+
+    fields = {
+        'task': task_name,
+        'payload': payload or {},
+        'run_at': timezone.now() + timedelta(seconds=delay),
+        'max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=key)
+
+
+def claim_next():
+    """Atomically take the oldest due job, or return None."""
+    from .models import Job
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    due = Job.objects.filter(
+        Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=stale)
+    ).order_by('run_at', 'id')
+
+    with transaction.atomic():
+        job = due.select_for_update(skip_locked=True).first()
+        if job is None:
+            return None
+        # The conditional UPDATE is what guarantees a single owner on
+        # backends without SELECT ... FOR UPDATE (SQLite).
+        claimed = Job.objects.filter(pk=job.pk, status=job.status, locked_at=job.locked_at).update(
+            status='running', locked_at=now, attempts=F('attempts') + 1,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def backoff(attempts):
+    return min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+
+
+def run_job(job):
+    """Execute a claimed job and record the outcome (done, retry or failed)."""
+    from .models import Job
+
+    handler = _registry.get(job.task)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for task {job.task!r}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(status='failed', last_error=error, locked_at=None)
+            logger.error("Job %s failed permanently", job, extra={'job_id': job.pk})
+        else:
+            retry_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', last_error=error, locked_at=None, run_at=retry_at,
+            )
+            logger.warning("Job %s failed, retrying at %s", job, retry_at)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status='done', locked_at=None, last_error='')
+    return True
+
+
+def run_pending(limit=None):
+    """Drain due jobs in this process; returns how many were run."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.archive import archive_batch, due_for_archival
+
+
+class Command(BaseCommand):
+    help = (
+        "Move denied and long-finished appointments (settings.ARCHIVE_AFTER_DAYS) "
+        "to the archive table and their images to archive storage, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--limit', type=int, help="Stop after archiving this many rows.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what is due.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        due = due_for_archival(now)
+        if options['dry_run']:
+            for status, days in settings.ARCHIVE_AFTER_DAYS.items():
+                count = due.filter(status=status).count()
+                self.stdout.write(f"{status}: {count} older than {days} days")
+            return
+
+        limit = options['limit']
+        moved, total, last_pk = {}, 0, 0
+        while limit is None or total < limit:
+            size = options['batch_size'] if limit is None else min(options['batch_size'], limit - total)
+            ids = list(due.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+            total += archive_batch(ids, now=now, moved=moved)
+            self.stdout.write(f"  archived {total} (up to id {last_pk})")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} appointment(s); {len(moved)} distinct file(s) relocated."
+        ))
@@ -0,0 +1,129 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+
+MODES = ('direct', 'persistent', 'pgbouncer', 'pool')
+
+
+class ConnectionTimer:
+    """Wraps the connection's connect() and is_usable() to time them."""
+
+    def __init__(self, wrapper):
+        self.connect_s = []
+        self.health_check_s = []
+        self._connect, self._is_usable = wrapper.connect, wrapper.is_usable
+        wrapper.connect = self.connect
+        wrapper.is_usable = self.is_usable
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return self._connect()
+        finally:
+            self.connect_s.append(time.perf_counter() - started)
+
+    def is_usable(self):
+        started = time.perf_counter()
+        try:
+            return self._is_usable()
+        finally:
+            self.health_check_s.append(time.perf_counter() - started)
+
+
+def ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request connection overhead (connect + health check) for "
+        "each DB_POOL_MODE against DATABASE_URL. Each mode runs in its own "
+        "process, since the mode is read from the environment by settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help="Comma-separated DB_POOL_MODE values to compare.")
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+        parser.add_argument('--worker', action='store_true', help="(internal) bench the current mode")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_requests(options['requests'])))
+            return
+
+        results = {}
+        for mode in options['modes'].split(','):
+            if mode not in MODES:
+                raise CommandError(f"Unknown mode {mode!r}; pick from {', '.join(MODES)}")
+            results[mode] = self.run_mode(mode, options['requests'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.report(results)
+
+    def run_mode(self, mode, requests):
+        proc = subprocess.run(
+            [sys.executable, sys.argv[0], 'bench_db_connections', '--worker', '--requests', str(requests)],
+            capture_output=True, text=True, env={**os.environ, 'DB_POOL_MODE': mode},
+        )
+        if proc.returncode != 0:
+            return {'error': (proc.stderr.strip().splitlines() or ['failed'])[-1]}
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # ===============================
+    # WORKER
+    # ===============================
+    def run_requests(self, requests):
+        """Simulate `requests` request cycles that each run one query."""
+        timer = ConnectionTimer(connection)
+        totals = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            # Like the handler, return the connection (to the pool, or close it)
+            request_finished.send(sender=self.__class__)
+            totals.append(time.perf_counter() - started)
+        close_old_connections()
+        connection.close()
+
+        return {
+            'vendor': connection.vendor,
+            'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE'),
+            'connects': len(timer.connect_s),
+            'connect_ms_per_request': ms(sum(timer.connect_s) / requests),
+            'health_checks': len(timer.health_check_s),
+            'health_check_ms_per_request': ms(sum(timer.health_check_s) / requests),
+            'p50_ms': ms(statistics.median(totals)),
+            'p95_ms': ms(statistics.quantiles(totals, n=20)[-1] if requests > 1 else totals[0]),
+        }
+
+    # ===============================
+    # OUTPUT
+    # ===============================
+    def report(self, results):
+        self.stdout.write(
+            f"{'mode':<12}{'connects':>10}{'connect ms/req':>16}{'checks':>8}"
+            f"{'check ms/req':>14}{'p50 ms':>9}{'p95 ms':>9}"
+        )
+        for mode, row in results.items():
+            if 'error' in row:
+                self.stdout.write(f"{mode:<12}  {row['error']}")
+                continue
+            self.stdout.write(
+                f"{mode:<12}{row['connects']:>10}{row['connect_ms_per_request']:>16.2f}"
+                f"{row['health_checks']:>8}{row['health_check_ms_per_request']:>14.2f}"
+                f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+            )
@@ -0,0 +1,66 @@
+import os
+import statistics
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+
+from booking.models import Appointment
+from booking.uploads import discard, save_with_uploads
+
+
+def random_png(side=600):
+    out = BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(out, 'PNG', compress_level=1)
+    return out.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time saving a booking with both images, sequential vs concurrent uploads. "
+        "Run with MEDIA_STORAGE=slow (MEDIA_LATENCY_MS per storage call) to "
+        "approximate Cloudinary round trips. Created rows and files are removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"media backend: {settings.STORAGES['default']['OPTIONS']['backend']}, "
+                          f"latency {settings.MEDIA_LATENCY_MS} ms/call")
+        results = {}
+        for label, parallel in (('sequential', False), ('parallel', True)):
+            timings = []
+            for _ in range(options['runs']):
+                appointment = Appointment(
+                    fullname='Bench Client', email='bench@example.com', contact='09000000000',
+                    date='2099-01-01', artstyle='Bench', status='Denied',
+                )
+                # Fresh bytes each run so content-addressed storage can't dedupe
+                appointment.art_image = ContentFile(random_png(), name='art.png')
+                appointment.payment_reference = ContentFile(random_png(), name='ref.png')
+                started = time.perf_counter()
+                with override_settings(PARALLEL_UPLOADS=parallel):
+                    save_with_uploads(appointment)
+                timings.append((time.perf_counter() - started) * 1000)
+                self.cleanup(appointment)
+            results[label] = statistics.median(timings)
+            self.stdout.write(f"{label:<12}{results[label]:>10.1f} ms (median of {len(timings)})")
+        self.stdout.write(self.style.SUCCESS(
+            f"speed-up x{results['sequential'] / results['parallel']:.2f}"
+        ))
+
+    def cleanup(self, appointment):
+        names = [getattr(appointment, field).name for field in Appointment.IMAGE_FIELDS]
+        names += [
+            name for entry in appointment.derivatives.values()
+            for label, name in entry.items() if label != 'source'
+        ]
+        with transaction.atomic():
+            Appointment.objects.filter(pk=appointment.pk).delete()
+        discard(appointment.art_image.storage, names)
@@ -0,0 +1,122 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.http.multipartparser import MultiPartParser
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+
+from booking.forms import AppointmentForm
+from booking.uploadhandlers import CappedImageUploadHandler
+
+
+def noise_png(megabytes):
+    """A PNG of roughly `megabytes` that doesn't compress (like a phone screenshot)."""
+    side = int((megabytes * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    out = BytesIO()
+    image.save(out, 'PNG', compress_level=1)
+    out.name = 'bench.png'
+    out.seek(0)
+    return out
+
+
+HANDLERS = {
+    'default': lambda: [MemoryFileUploadHandler(), TemporaryFileUploadHandler()],
+    'capped': lambda: [CappedImageUploadHandler()],
+}
+
+
+def booking_body(megabytes):
+    return encode_multipart(BOUNDARY, {
+        'fullname': 'Bench', 'email': 'bench@example.com', 'contact': '0917',
+        'date': '2025-01-01', 'artstyle': 'Chibi', 'payment_reference': noise_png(megabytes),
+    })
+
+
+def max_rss():
+    """Peak resident set size of this process in bytes (ru_maxrss is KB on Linux)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the memory cost of parsing + validating one booking upload with "
+        "Django's default upload handlers vs CappedImageUploadHandler. Each run "
+        "gets its own process: 'peak RSS' is the growth of the process high-water "
+        "mark and includes Pillow's C buffers; 'peak heap' is Python objects only "
+        "(tracemalloc)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='0.5,2,3.5', help="Comma-separated upload sizes in MB.")
+        parser.add_argument('--worker', nargs=2, metavar=('BODY_FILE', 'HANDLERS'), help="(internal) measure one run")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            path, label = options['worker']
+            self.stdout.write(json.dumps(self.run_worker(path, label)))
+            return
+
+        self.stdout.write(f"{'size':>8} {'handlers':>10} {'peak RSS':>12} {'peak heap':>12} {'time':>9}  result")
+        for size in (float(s) for s in options['sizes'].split(',')):
+            # Built here: encoding the PNG would raise the worker's high-water mark
+            with tempfile.NamedTemporaryFile(suffix='.multipart') as body:
+                body.write(booking_body(size))
+                body.flush()
+                rows = {label: self.run_in_subprocess(body.name, label) for label in HANDLERS}
+            for label, row in rows.items():
+                self.stdout.write(
+                    f"{size:>6.1f}MB {label:>10} {row['rss'] / 1024 / 1024:>10.2f}MB "
+                    f"{row['heap'] / 1024 / 1024:>10.2f}MB {row['ms']:>7.1f}ms  {row['result']}"
+                )
+
+    def run_in_subprocess(self, path, label):
+        proc = subprocess.run(
+            [sys.executable, sys.argv[0], 'bench_uploads', '--worker', path, label],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError((proc.stderr.strip().splitlines() or ['worker failed'])[-1])
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # ===============================
+    # WORKER
+    # ===============================
+    def run_worker(self, path, label):
+        with open(path, 'rb') as source:
+            body = source.read()
+        # Warm imports/caches on a tiny upload so the high-water mark stays put
+        self.measure(booking_body(0.01), HANDLERS[label]())
+        baseline = max_rss()
+        heap, elapsed, result = self.measure(body, HANDLERS[label]())
+        return {
+            'rss': max_rss() - baseline,
+            'heap': heap,
+            'ms': round(elapsed * 1000, 1),
+            'result': result if isinstance(result, str) else json.dumps(result),
+        }
+
+    def measure(self, body, upload_handlers):
+        meta = {'CONTENT_TYPE': MULTIPART_CONTENT, 'CONTENT_LENGTH': str(len(body))}
+        stream = BytesIO(body)
+        tracemalloc.start()
+        started = time.perf_counter()
+        post, files = MultiPartParser(meta, stream, upload_handlers).parse()
+        form = AppointmentForm(post, files)
+        valid = form.is_valid()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for f in files.values():
+            f.close()
+        return peak, elapsed, 'valid' if valid else dict(form.errors)
@@ -0,0 +1,197 @@
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from booking.models import Appointment, CustomUser, StoredBlob
+from booking.pagination import encode_cursor
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Rollback(Exception):
+    """Raised to undo everything the benchmark wrote."""
+
+
+class QueryCounter:
+    """execute_wrapper that counts queries (queries_log is reset per request)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def small_png():
+    out = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 80)).save(out, 'PNG')
+    return out.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main views against the current database (see seed_bookings): "
+        "p50/p95 latency, query count and peak Python memory per view, compared "
+        "with a stored baseline (benchmarks/baseline.json, recorded against the "
+        "default seed_bookings data). Database writes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Store this run as the new baseline instead of comparing.")
+        parser.add_argument('--check', action='store_true',
+                            help="Fail when there is no baseline to compare with (for CI).")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed p95 slowdown over the baseline (0.25 = 25%%).")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options['baseline'])
+        if options['check'] and not options['update_baseline'] and not baseline_path.exists():
+            raise CommandError(
+                f"No baseline at {baseline_path}; create one with manage.py bench_views --update-baseline."
+            )
+        if not Appointment.objects.exists():
+            raise CommandError("No appointments to benchmark; run manage.py seed_bookings first.")
+
+        # Per-request log lines would drown the report (and cost time)
+        logging.disable(logging.WARNING)
+        last_blob = StoredBlob.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        try:
+            with transaction.atomic():
+                results = self.run_benchmarks(options['iterations'])
+                written = list(StoredBlob.objects.filter(pk__gt=last_blob).values_list('name', flat=True))
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            logging.disable(logging.NOTSET)
+
+        # The blob rows were rolled back; drop the files book:post uploaded
+        storage = getattr(default_storage, 'inner', default_storage)
+        for name in written:
+            storage.delete(name)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.report(results)
+
+        if options['update_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+        elif baseline_path.exists():
+            self.compare(results, json.loads(baseline_path.read_text()), options['tolerance'])
+
+    # ===============================
+    # SCENARIOS
+    # ===============================
+    def scenarios(self):
+        """(name, method, url, data factory) for each benchmarked request."""
+        dashboard = reverse('admin_dashboard')
+        deep = Appointment.objects.order_by('-created_at', '-id').values_list('created_at', 'id')
+        deep = deep[min(Appointment.objects.count() - 1, 5_000)]
+        image = small_png()
+        future = timezone.localdate() + timedelta(days=400)
+        counter = iter(range(1_000_000))
+
+        def booking():
+            # A fresh date per request so the daily capacity never fills up
+            return {
+                'fullname': 'Bench Client',
+                'email': 'bench@example.com',
+                'contact': '09000000000',
+                'date': (future + timedelta(days=next(counter))).isoformat(),
+                'artstyle': 'Chibi Style (₱100 - ₱200)',
+                'art_image': SimpleUploadedFile('art.png', image, 'image/png'),
+                'payment_reference': SimpleUploadedFile('ref.png', image, 'image/png'),
+            }
+
+        return [
+            ('admin_dashboard', 'get', dashboard, None),
+            ('admin_dashboard:deep', 'get', f"{dashboard}?after={encode_cursor(*deep)}", None),
+            ('admin_dashboard:filtered', 'get', f"{dashboard}?status=Accepted&date_from=2000-01-01", None),
+            ('admin_gallery', 'get', reverse('admin_gallery'), None),
+            ('gallery', 'get', reverse('gallery'), None),
+            ('book', 'get', reverse('book'), None),
+            ('book:post', 'post', reverse('book'), booking),
+        ]
+
+    def run_benchmarks(self, iterations):
+        admin = CustomUser.objects.create_superuser(
+            username='bench-admin', email='bench-admin@example.com', password=None,
+        )
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(admin)
+
+        results = {}
+        for name, method, url, data in self.scenarios():
+            request = lambda: getattr(client, method)(url, data() if data else None)
+
+            # Warm-up request also records query count and memory peak
+            queries = QueryCounter()
+            tracemalloc.start()
+            with connection.execute_wrapper(queries):
+                response = request()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if response.status_code >= 400 or (method == 'get' and response.status_code != 200):
+                raise CommandError(f"{name}: {url} returned {response.status_code}")
+
+            timings = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0], 2),
+                'queries': queries.count,
+                'peak_kb': round(peak / 1024, 1),
+            }
+        return results
+
+    # ===============================
+    # OUTPUT
+    # ===============================
+    def report(self, results):
+        self.stdout.write(f"{'view':<28}{'p50 ms':>10}{'p95 ms':>10}{'queries':>10}{'peak KB':>12}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<28}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['queries']:>10}{row['peak_kb']:>12.1f}"
+            )
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, row in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if row['queries'] > base['queries']:
+                regressions.append(f"{name}: {row['queries']} queries (baseline {base['queries']})")
+            if row['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {row['p95_ms']} ms (baseline {base['p95_ms']} ms)")
+
+        if regressions:
+            raise CommandError("Regressions against baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from booking.models import Appointment, StoredBlob, UploadedArt
+from booking.storage import ContentAddressedStorage, content_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Collapse byte-identical media files referenced by Appointment and "
+        "UploadedArt onto one content-addressed blob each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report duplicates without changing anything.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("STORAGES['default'] is not booking.storage.ContentAddressedStorage.")
+        dry_run = options['dry_run']
+        inner = default_storage.inner
+
+        # name -> number of row/field references
+        references = defaultdict(int)
+        for model in (Appointment, UploadedArt):
+            for field in model.IMAGE_FIELDS:
+                names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                for name in names.values_list(field, flat=True).iterator():
+                    references[name] += 1
+
+        known = dict(StoredBlob.objects.filter(name__in=references).values_list('name', 'sha256'))
+        by_digest = defaultdict(list)
+        for name in references:
+            digest = known.get(name)
+            if digest is None:
+                try:
+                    with inner.open(name, 'rb') as fh:
+                        digest = content_hash(fh)
+                except (OSError, ValueError) as exc:
+                    self.stderr.write(f"skip {name}: {exc}")
+                    continue
+            by_digest[digest].append(name)
+
+        saved_files = 0
+        for digest, names in by_digest.items():
+            canonical = next((n for n in names if n in known), sorted(names)[0])
+            duplicates = [n for n in names if n != canonical]
+            refs = sum(references[n] for n in names)
+            if duplicates:
+                self.stdout.write(f"{canonical} <- {', '.join(duplicates)}")
+            if dry_run:
+                saved_files += len(duplicates)
+                continue
+
+            with transaction.atomic():
+                for model in (Appointment, UploadedArt):
+                    for field in model.IMAGE_FIELDS:
+                        model.objects.filter(**{f'{field}__in': duplicates}).update(**{field: canonical})
+                StoredBlob.objects.update_or_create(
+                    sha256=digest,
+                    defaults={'name': canonical, 'refcount': refs, 'size': inner.size(canonical)},
+                )
+            for name in duplicates:
+                inner.delete(name)
+                saved_files += 1
+
+        verb = "Would remove" if dry_run else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {saved_files} duplicate files across {len(by_digest)} unique blobs."
+        ))
+        if saved_files and not dry_run:
+            self.stdout.write("Run `manage.py build_derivatives` to refresh thumbnails for rewritten rows.")
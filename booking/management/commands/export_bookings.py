@@ -0,0 +1,52 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream appointments or gallery records as CSV or JSONL, with the admin "
+        "dashboard filters. Memory stays flat regardless of the row count."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', nargs='?', default='appointments', choices=sorted(exports.FIELDS))
+        parser.add_argument('--format', default='csv', choices=sorted(exports.FORMATS))
+        parser.add_argument('--status')
+        parser.add_argument('--artstyle')
+        parser.add_argument('--date-from', help="YYYY-MM-DD (booking date; upload date for gallery)")
+        parser.add_argument('--date-to', help="YYYY-MM-DD, inclusive")
+        parser.add_argument('--archived', action='store_true', help="Export archived appointments instead.")
+        parser.add_argument('--output', '-o', help="Write to this file instead of stdout.")
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        params = {
+            'status': options['status'] or '',
+            'artstyle': options['artstyle'] or '',
+            'date_from': options['date_from'] or '',
+            'date_to': options['date_to'] or '',
+        }
+        if options['archived']:
+            params['archived'] = 'on'
+        try:
+            rows = exports.export_rows(options['kind'], params, options['chunk_size'])
+        except exports.InvalidFilters as exc:
+            raise CommandError(f"Invalid filters:\n{exc}")
+
+        lines = exports.serialise(options['kind'], options['format'], rows)
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            count = -1 if options['format'] == 'csv' else 0
+            for line in lines:
+                out.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['output']:
+            self.stderr.write(f"Exported {count} row(s) to {options['output']}")
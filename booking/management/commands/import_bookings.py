@@ -0,0 +1,90 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import capacity, conditional, imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical bookings and finished pieces from a CSV or JSONL file "
+        "plus a folder of images. Rows are written in batches with bulk_create; "
+        "progress is checkpointed after every batch, so re-running the same "
+        "command after a crash carries on where it stopped.\n\n"
+        "Columns: kind (appointment|gallery), fullname, email, contact, date, "
+        "artstyle, status, created_at, username, art_image, payment_reference; "
+        "gallery rows use client_name, contact, date_uploaded, art, reference. "
+        "Image columns are paths relative to --images."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="CSV or JSONL file.")
+        parser.add_argument('--images', default='.', help="Directory the image paths are relative to.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Default: from the file extension.")
+        parser.add_argument('--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=settings.IMPORT_WORKERS,
+                            help="Concurrent image uploads.")
+        parser.add_argument('--checkpoint', help="Default: <source>.checkpoint")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint.")
+        parser.add_argument('--no-gallery', action='store_true',
+                            help="Do not create gallery entries for accepted bookings.")
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if not os.path.isfile(source):
+            raise CommandError(f"{source} does not exist")
+        checkpoint = imports.Checkpoint(options['checkpoint'] or f"{source}.checkpoint", source)
+        done = 0 if options['restart'] else checkpoint.load()
+        if done:
+            self.stdout.write(f"Resuming after row {done}")
+
+        rows = islice(imports.read_rows(source, options['format']), done, None)
+        counts = {'appointments': 0, 'gallery': 0, 'skipped': 0, 'existing': 0}
+        user_ids = set()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                records = self.parse(batch, options['images'], first_row=done + 1, counts=counts)
+                fresh = imports.drop_existing(records)
+                counts['existing'] += len(records) - len(fresh)
+
+                stored = imports.upload_images(fresh, pool)
+                try:
+                    appointments, entries = imports.write_batch(fresh, promote=not options['no_gallery'])
+                except Exception as exc:
+                    imports.release(stored)
+                    if isinstance(exc, imports.RowError):
+                        raise CommandError(f"Rows {done + 1}-{done + len(batch)}: {exc}") from exc
+                    raise
+
+                done += len(batch)
+                checkpoint.save(done)
+                counts['appointments'] += len(appointments)
+                counts['gallery'] += len(entries)
+                user_ids.update(a.user_id for a in appointments)
+                self.stdout.write(f"  row {done}: {counts['appointments']} bookings, {counts['gallery']} gallery entries")
+
+        # bulk_create skips the signals that maintain these
+        capacity.rebuild_counts()
+        conditional.bump('admin', *(conditional.user_scope(pk) for pk in user_ids))
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['appointments']} booking(s) and {counts['gallery']} gallery entr(ies); "
+            f"{counts['existing']} already present, {counts['skipped']} skipped. "
+            "Run manage.py build_derivatives to create thumbnails."
+        ))
+
+    def parse(self, batch, image_dir, first_row, counts):
+        records = []
+        for number, row in enumerate(batch, start=first_row):
+            try:
+                records.append(imports.parse_row(row, image_dir))
+            except imports.RowError as exc:
+                counts['skipped'] += 1
+                self.stderr.write(f"row {number}: {exc}")
+        return records
@@ -0,0 +1,121 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter (python -X importtime) so nothing is pre-imported.
+PROBE = r"""
+import json, os, time
+t0 = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trishartsy.settings')
+
+from django.apps import config as app_config
+per_app = {}
+_create, _import_models = app_config.AppConfig.create, app_config.AppConfig.import_models
+
+def create(entry):
+    started = time.perf_counter()
+    cfg = _create(entry)
+    per_app.setdefault(cfg.name, {})['config'] = time.perf_counter() - started
+    return cfg
+
+def import_models(self):
+    started = time.perf_counter()
+    _import_models(self)
+    per_app.setdefault(self.name, {})['models'] = time.perf_counter() - started
+
+app_config.AppConfig.create = staticmethod(create)
+app_config.AppConfig.import_models = import_models
+
+from django.conf import settings
+settings.INSTALLED_APPS
+phases = [('settings', time.perf_counter() - t0)]
+
+mark = time.perf_counter()
+import django
+django.setup(set_prefix=False)
+phases.append(('apps.populate', time.perf_counter() - mark))
+
+mark = time.perf_counter()
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+phases.append(('middleware', time.perf_counter() - mark))
+
+mark = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+phases.append(('urlconf', time.perf_counter() - mark))
+
+phases.append(('total', time.perf_counter() - t0))
+print(json.dumps({'phases': phases, 'apps': per_app}))
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start time of the WSGI app in a fresh interpreter: settings, "
+        "per-app config/models import, middleware, URLconf, and the slowest imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lazy', choices=['on', 'off'], help="Force LAZY_STARTUP for the probe.")
+        parser.add_argument('--top', type=int, default=15, help="How many top-level imports to list.")
+        parser.add_argument('--runs', type=int, default=3, help="Probe runs; the fastest is reported.")
+        parser.add_argument('--enforce', action='store_true',
+                            help="Exit with an error if total exceeds COLD_START_BUDGET_MS.")
+        parser.add_argument('--budget-ms', type=int, default=settings.COLD_START_BUDGET_MS)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', os.environ.get('DJANGO_SETTINGS_MODULE', 'trishartsy.settings'))
+        if options['lazy']:
+            env['LAZY_STARTUP'] = 'True' if options['lazy'] == 'on' else 'False'
+
+        runs = [self.probe(env) for _ in range(max(options['runs'], 1))]
+        result, imports = min(runs, key=lambda run: dict(run[0]['phases'])['total'])
+        phases = dict(result['phases'])
+
+        self.stdout.write(f"{'phase':<40}{'ms':>10}")
+        for name, seconds in result['phases']:
+            self.stdout.write(f"{name:<40}{seconds * 1000:>10.1f}")
+            if name == 'apps.populate':
+                for app, timing in result['apps'].items():
+                    ms = (timing.get('config', 0) + timing.get('models', 0)) * 1000
+                    self.stdout.write(f"  {app:<38}{ms:>10.1f}")
+
+        self.stdout.write(f"\n{'slowest top-level imports':<40}{'ms':>10}")
+        for module, us in sorted(imports.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {module:<38}{us / 1000:>10.1f}")
+
+        total_ms = phases['total'] * 1000
+        budget = options['budget_ms']
+        verdict = f"\ncold start {total_ms:.0f} ms (budget {budget} ms)"
+        if total_ms > budget:
+            if options['enforce']:
+                raise CommandError(verdict.strip() + " exceeded")
+            self.stdout.write(self.style.WARNING(verdict))
+        else:
+            self.stdout.write(self.style.SUCCESS(verdict))
+
+    def probe(self, env):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "probe failed")
+
+        # Cumulative time of each outermost import, grouped by top-level package
+        imports = defaultdict(int)
+        for line in proc.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match and len(match.group(3)) == 1:
+                imports[match.group(4).split('.')[0]] += int(match.group(2))
+        return json.loads(proc.stdout.strip().splitlines()[-1]), imports
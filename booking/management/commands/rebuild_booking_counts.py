@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from booking.capacity import rebuild_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-day booking counters used for capacity checks."
+
+    def handle(self, *args, **options):
+        rows = rebuild_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily count rows."))
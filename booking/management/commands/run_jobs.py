@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (gallery promotion etc.). Loops until interrupted unless --once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain due jobs and exit.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--max-jobs', type=int, default=None, help="Exit after running this many jobs.")
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                remaining = None if options['max_jobs'] is None else options['max_jobs'] - total
+                ran = run_pending(limit=remaining)
+                total += ran
+                if options['once'] or (remaining is not None and ran >= remaining):
+                    break
+                if not ran:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Ran {total} jobs."))
@@ -0,0 +1,119 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from booking import capacity, conditional
+from booking.imports import explicit_timestamps
+from booking.models import Appointment, CustomUser, UploadedArt
+from booking.storage import retain_shared_files
+
+STATUSES = ['Pending'] * 2 + ['Accepted'] * 5 + ['Denied'] * 3
+
+
+def synthetic_image(rng, index, size=(480, 640)):
+    image = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        box = sorted(rng.sample(range(size[0]), 2)), sorted(rng.sample(range(size[1]), 2))
+        draw.rectangle([box[0][0], box[1][0], box[0][1], box[1][1]],
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    draw.text((10, 10), f"seed #{index}", fill=(0, 0, 0))
+    out = BytesIO()
+    image.save(out, 'PNG')
+    return out.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset (users, appointments across statuses, "
+        "gallery uploads, images) for load testing. Run with MEDIA_STORAGE=local "
+        "to keep images on the filesystem instead of Cloudinary."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=10_000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--uploads', type=int, default=1_000, help="UploadedArt rows.")
+        parser.add_argument('--images', type=int, default=24, help="Distinct synthetic images to reuse.")
+        parser.add_argument('--days', type=int, default=730, help="Spread bookings over this many past days.")
+        parser.add_argument('--batch-size', type=int, default=1_000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch = options['batch_size']
+        now = timezone.now()
+        run = f"{options['seed']}-{int(now.timestamp())}"
+
+        images = [
+            default_storage.save(f"seed/seed_{i}.png", ContentFile(synthetic_image(rng, i)))
+            for i in range(options['images'])
+        ]
+        self.stdout.write(f"Saved {len(images)} synthetic images")
+
+        password = make_password('seed-password')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f"seed-{run}-{i}@example.com", email=f"seed-{run}-{i}@example.com",
+                first_name=f"Seed{i}", password=password, role='customer',
+            )
+            for i in range(options['users'])
+        ], batch_size=batch)
+        self.stdout.write(f"Created {len(users)} users")
+
+        created_field = Appointment._meta.get_field('created_at')
+        uploaded_field = UploadedArt._meta.get_field('date_uploaded')
+        with explicit_timestamps(created_field, uploaded_field):
+            total = 0
+            while total < options['appointments']:
+                chunk = []
+                for _ in range(min(batch, options['appointments'] - total)):
+                    user = rng.choice(users)
+                    created = now - timedelta(days=rng.uniform(0, options['days']))
+                    chunk.append(Appointment(
+                        user=user,
+                        fullname=f"{user.first_name} Client",
+                        email=user.email,
+                        contact=f"09{rng.randrange(10**9):09d}",
+                        date=created.date() + timedelta(days=rng.randrange(1, 60)),
+                        artstyle=rng.choice(Appointment.ART_STYLES),
+                        art_image=rng.choice(images),
+                        payment_reference=rng.choice(images),
+                        status=rng.choice(STATUSES),
+                        created_at=created,
+                    ))
+                Appointment.objects.bulk_create(chunk, batch_size=batch)
+                retain_shared_files(getattr(a, name) for a in chunk for name in Appointment.IMAGE_FIELDS)
+                total += len(chunk)
+                self.stdout.write(f"  appointments: {total}/{options['appointments']}")
+
+            uploads = [
+                UploadedArt(
+                    client_name=f"Seed{i} Client",
+                    contact=f"09{rng.randrange(10**9):09d}",
+                    art=rng.choice(images),
+                    reference=rng.choice(images),
+                    date_uploaded=now - timedelta(days=rng.uniform(0, options['days'])),
+                )
+                for i in range(options['uploads'])
+            ]
+            UploadedArt.objects.bulk_create(uploads, batch_size=batch)
+            retain_shared_files(getattr(u, name) for u in uploads for name in UploadedArt.IMAGE_FIELDS)
+        self.stdout.write(f"Created {len(uploads)} gallery uploads")
+
+        # The rows above now hold every reference; drop the one save() took
+        # for this command (and any image no row happened to pick)
+        for name in images:
+            default_storage.delete(name)
+
+        # bulk_create skips the signals that maintain the daily counters
+        capacity.rebuild_counts()
+        conditional.bump('admin')
+        self.stdout.write(self.style.SUCCESS("Seeding complete."))
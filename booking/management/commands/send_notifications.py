@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.notifications import deliver_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued customer emails from the outbox in batches, one mail "
+        "connection per batch. Loops until interrupted unless --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain due messages and exit.")
+        parser.add_argument('--sleep', type=float, default=5.0, help="Seconds to wait when the outbox is empty.")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = deliver_batch(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if not (sent or failed):
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} message(s), {total_failed} failed."))
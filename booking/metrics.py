@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+# Latency buckets in seconds (Prometheus convention)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request stats; set by RequestMetricsMiddleware, read by the DB and storage hooks
+current_request = ContextVar('current_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.query_shapes = Counter()
+        self.storage_calls = 0
+        self.storage_time = 0.0
+
+
+# ===============================
+# PROCESS-WIDE REGISTRY
+# ===============================
+class Registry:
+    """
+    In-process metrics, exposed in Prometheus text format.
+
+    Each serverless instance keeps its own numbers; scrape or aggregate
+    per instance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()                     # (view, status class)
+            self.latency_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+            self.latency_sum = Counter()
+            self.latency_count = Counter()
+            self.db_queries = Counter()
+            self.db_seconds = Counter()
+            self.storage_calls = Counter()
+            self.storage_seconds = Counter()
+            self.response_bytes = Counter()
+
+    def observe(self, view, status, seconds, stats, size):
+        with self._lock:
+            self.requests[(view, f"{status // 100}xx")] += 1
+            buckets = self.latency_buckets[view]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self.latency_sum[view] += seconds
+            self.latency_count[view] += 1
+            self.db_queries[view] += stats.queries
+            self.db_seconds[view] += stats.query_time
+            self.storage_calls[view] += stats.storage_calls
+            self.storage_seconds[view] += stats.storage_time
+            self.response_bytes[view] += size
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family('trishartsy_requests_total', 'counter', 'Requests by view and status class.')
+            for (view, status), value in sorted(self.requests.items()):
+                lines.append(f'trishartsy_requests_total{{view="{view}",status="{status}"}} {value}')
+
+            family('trishartsy_request_duration_seconds', 'histogram', 'Request latency by view.')
+            for view in sorted(self.latency_count):
+                for bound, value in zip(LATENCY_BUCKETS, self.latency_buckets[view]):
+                    lines.append(f'trishartsy_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {value}')
+                count = self.latency_count[view]
+                lines.append(f'trishartsy_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {count}')
+                lines.append(f'trishartsy_request_duration_seconds_sum{{view="{view}"}} {self.latency_sum[view]:.6f}')
+                lines.append(f'trishartsy_request_duration_seconds_count{{view="{view}"}} {count}')
+
+            for name, source, help_text in (
+                ('trishartsy_db_queries_total', self.db_queries, 'Database queries by view.'),
+                ('trishartsy_db_query_seconds_total', self.db_seconds, 'Database time by view.'),
+                ('trishartsy_storage_calls_total', self.storage_calls, 'Media storage backend calls by view.'),
+                ('trishartsy_storage_seconds_total', self.storage_seconds, 'Media storage time by view.'),
+                ('trishartsy_response_bytes_total', self.response_bytes, 'Response body bytes by view.'),
+            ):
+                family(name, 'counter', help_text)
+                for view, value in sorted(source.items()):
+                    value = f"{value:.6f}" if isinstance(value, float) else value
+                    lines.append(f'{name}{{view="{view}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ===============================
+# HOOKS
+# ===============================
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def query_shape(sql):
+    """SQL with literals stripped, so repeated per-row queries group together."""
+    return _LITERALS.sub('?', sql)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - started
+        stats.query_shapes[query_shape(sql)] += 1
+
+
+class InstrumentedStorage:
+    """Proxy that times remote-touching calls on a storage backend."""
+
+    TIMED = frozenset({'save', 'open', 'exists', 'delete', 'size', 'listdir'})
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage, name)
+        if name not in self.TIMED or not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            stats = current_request.get()
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                if stats is not None:
+                    stats.storage_calls += 1
+                    stats.storage_time += time.perf_counter() - started
+        return timed
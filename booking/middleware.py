@@ -0,0 +1,117 @@
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import RequestStats, current_request, db_execute_wrapper, registry
+
+logger = logging.getLogger('booking.requests')
+
+
+class LazyWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that walks STATIC_ROOT and the staticfiles finders on the
+    first request under STATIC_URL instead of at process start, so a cold
+    serverless start that only renders a page never pays for the scan.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._deferred_scans = []
+        self._deferring = True
+        self._scan_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+        self._deferring = False
+
+    def add_files(self, *args, **kwargs):
+        if self._deferring:
+            self._deferred_scans.append((super().add_files, args, kwargs))
+        else:
+            super().add_files(*args, **kwargs)
+
+    def add_files_from_finders(self):
+        if self._deferring:
+            self._deferred_scans.append((super().add_files_from_finders, (), {}))
+        else:
+            super().add_files_from_finders()
+
+    def __call__(self, request):
+        if self._deferred_scans and request.path_info.startswith(self.static_prefix):
+            with self._scan_lock:
+                while self._deferred_scans:
+                    scan, args, kwargs = self._deferred_scans.pop(0)
+                    scan(*args, **kwargs)
+        return super().__call__(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB queries/time, media storage calls/time and response
+    size per view into booking.metrics.registry (served by /metrics/), and
+    logs one JSON line per request, at WARNING for slow requests or when the
+    same query shape repeats past N_PLUS_ONE_THRESHOLD.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            with _wrap_all_connections():
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, response.status_code, elapsed, stats, size)
+        self.log(request, response, view, elapsed, stats, size)
+        return response
+
+    def log(self, request, response, view, elapsed, stats, size):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 1),
+            'db_queries': stats.queries,
+            'db_ms': round(stats.query_time * 1000, 1),
+            'storage_calls': stats.storage_calls,
+            'storage_ms': round(stats.storage_time * 1000, 1),
+            'bytes': size,
+        }
+        warnings = []
+        if elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            warnings.append('slow_request')
+        repeated = [(shape, n) for shape, n in stats.query_shapes.items() if n >= settings.N_PLUS_ONE_THRESHOLD]
+        if repeated:
+            warnings.append('n_plus_one')
+            shape, n = max(repeated, key=lambda item: item[1])
+            record['repeated_query'] = {'count': n, 'sql': shape[:300]}
+        if warnings:
+            record['warnings'] = warnings
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
+
+class _wrap_all_connections:
+    """Install the timing hook on every configured database alias."""
+
+    def __enter__(self):
+        self._stack = [connections[alias].execute_wrapper(db_execute_wrapper) for alias in connections]
+        for cm in self._stack:
+            cm.__enter__()
+
+    def __exit__(self, *exc):
+        for cm in reversed(self._stack):
+            cm.__exit__(*exc)
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_daily_counts(apps, schema_editor):
+    Appointment = apps.get_model('booking', 'Appointment')
+    DailyBookingCount = apps.get_model('booking', 'DailyBookingCount')
+
+    counted = Appointment.objects.filter(status__in=['Pending', 'Accepted'])
+    rows = [
+        DailyBookingCount(date=r['date'], artstyle=r['artstyle'], count=r['n'])
+        for r in counted.values('date', 'artstyle').annotate(n=Count('id'))
+    ] + [
+        DailyBookingCount(date=r['date'], artstyle='', count=r['n'])
+        for r in counted.values('date').annotate(n=Count('id'))
+    ]
+    DailyBookingCount.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacityLimit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True)),
+                ('artstyle', models.CharField(blank=True, max_length=100)),
+                ('max_bookings', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyBookingCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('artstyle', models.CharField(blank=True, max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date'], name='appt_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='capacitylimit',
+            constraint=models.UniqueConstraint(fields=('date', 'artstyle'), name='capacity_limit_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailybookingcount',
+            constraint=models.UniqueConstraint(fields=('date', 'artstyle'), name='daily_count_unique'),
+        ),
+        migrations.RunPython(backfill_daily_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Expressions must stay identical to APPOINTMENT_DOC / UPLOAD_DOC in booking/search.py
+APPOINTMENT_DOC = "(fullname || ' ' || email || ' ' || contact || ' ' || artstyle)"
+
+POSTGRES_INDEXES = [
+    ("appt_search_tsv_idx",
+     f"booking_appointment USING gin (to_tsvector('simple', {APPOINTMENT_DOC}))"),
+    ("appt_search_trgm_idx",
+     f"booking_appointment USING gin ({APPOINTMENT_DOC} gin_trgm_ops)"),
+    ("upload_search_tsv_idx",
+     "booking_uploadedart USING gin (to_tsvector('simple', client_name))"),
+    ("upload_search_trgm_idx",
+     "booking_uploadedart USING gin (client_name gin_trgm_ops)"),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    # SQLite gets FTS5 tables from the post_migrate hook instead (see booking.search)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, definition in POSTGRES_INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in POSTGRES_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_user_login_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:19
+
+import booking.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fullname', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=100)),
+                ('contact', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('artstyle', models.CharField(max_length=100)),
+                ('payment_reference', models.ImageField(blank=True, max_length=255, null=True, storage=booking.models.archive_storage, upload_to='')),
+                ('art_image', models.ImageField(blank=True, max_length=255, null=True, storage=booking.models.archive_storage, upload_to='')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Accepted', 'Accepted'), ('Denied', 'Denied')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='archived_created_idx'), models.Index(fields=['status', '-created_at', '-id'], name='archived_status_created_idx'), models.Index(fields=['user', '-created_at'], name='archived_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_existing_entries(apps, schema_editor):
+    """Attach pre-FK gallery rows to the accepted booking they were copied from."""
+    Appointment = apps.get_model('booking', 'Appointment')
+    UploadedArt = apps.get_model('booking', 'UploadedArt')
+
+    # Promotion copied name, contact and the art blob name verbatim
+    sources = {}
+    accepted = Appointment.objects.filter(status='Accepted').order_by('created_at', 'id')
+    for pk, fullname, contact, art in accepted.values_list('id', 'fullname', 'contact', 'art_image').iterator():
+        sources.setdefault((fullname, contact, art or ''), []).append(pk)
+
+    linked = []
+    for entry in UploadedArt.objects.filter(appointment__isnull=True).order_by('date_uploaded', 'id').iterator():
+        candidates = sources.get((entry.client_name, entry.contact, entry.art.name or ''))
+        if candidates:
+            entry.appointment_id = candidates.pop(0)
+            linked.append(entry)
+    UploadedArt.objects.bulk_update(linked, ['appointment'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_archived_appointment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedart',
+            name='appointment',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='gallery_entry', to='booking.appointment'),
+        ),
+        migrations.RunPython(link_existing_entries, migrations.RunPython.noop),
+    ]
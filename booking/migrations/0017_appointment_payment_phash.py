@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='payment_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
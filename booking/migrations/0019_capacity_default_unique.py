@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0018_page_version'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='capacitylimit',
+            constraint=models.UniqueConstraint(condition=models.Q(('date__isnull', True)), fields=('artstyle',), name='capacity_default_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0019_capacity_default_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedappointment',
+            name='payment_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
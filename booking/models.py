@@ -1,7 +1,22 @@
-from django.db import models
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.files.storage import storages
+from django.db import connections, models
+from django.db.models.functions import Upper
+from django.db.models.signals import pre_save, post_save, post_delete, post_init, post_migrate
+from django.dispatch import receiver
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django import forms
 
+from . import capacity, conditional, search
+from .caching import invalidate_user
+from .images import build_derivatives, derivatives_for, perceptual_hash
+
+logger = logging.getLogger(__name__)
+
 
 # ===============================
 # CUSTOM USER MODEL (with roles)
@@ -13,6 +28,13 @@ class CustomUser(AbstractUser):
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='customer')
 
+    class Meta(AbstractUser.Meta):
+        # Case-insensitive login lookups (username__iexact / email__iexact)
+        indexes = [
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
@@ -26,6 +48,17 @@ class Appointment(models.Model):
         ('Accepted', 'Accepted'),
         ('Denied', 'Denied'),
     ]
+    # The styles offered on book.html, stored verbatim (price range included)
+    ART_STYLES = [
+        'Line Art Style (₱40 - ₱200)',
+        'No Face Features Art Style (₱80 - ₱150)',
+        'Detailed Vector Art (₱80 - ₱250)',
+        'Detailed Vector w/ Background (₱250 - ₱800)',
+        'Cutesie Cartoon Art Style (₱80 - ₱200)',
+        'Cutesie Cartoon w/ Background (₱150 - ₱300)',
+        'Pet Illustration (₱80 - ₱150)',
+        'Chibi Style (₱100 - ₱200)',
+    ]
 
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)
     fullname = models.CharField(max_length=100)
@@ -51,10 +84,30 @@ class Appointment(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Thumbnail/medium names per image field, filled in after upload
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Perceptual hash of payment_reference, for spotting reused screenshots (booking.phash)
+    payment_phash = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    IMAGE_FIELDS = ('art_image', 'payment_reference')
+    # Image field -> field holding its perceptual hash
+    PHASH_FIELDS = {'payment_reference': 'payment_phash'}
+
+    # Moved rows are ArchivedAppointment instances (archived = True)
+    archived = False
+
     class Meta:
         verbose_name = "Appointment"
         verbose_name_plural = "Appointments"
         ordering = ['-created_at']
+        # Keyset pagination on the admin dashboard walks (created_at, id);
+        # each filter gets its own prefix so a page is one index range scan.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='appt_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='appt_status_created_idx'),
+            models.Index(fields=['artstyle', '-created_at', '-id'], name='appt_style_created_idx'),
+            models.Index(fields=['date'], name='appt_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.fullname} - {self.artstyle} ({self.status})"
@@ -66,16 +119,66 @@ class Appointment(models.Model):
         return self.status == 'Accepted'
 
 
+# ===============================
+# BOOKING CAPACITY
+# ===============================
+class CapacityLimit(models.Model):
+    """
+    Max bookings per day. A blank artstyle limits the whole day; a blank
+    date makes the row the default for every date without its own row.
+    """
+    date = models.DateField(null=True, blank=True)
+    artstyle = models.CharField(max_length=100, blank=True)
+    max_bookings = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'artstyle'], name='capacity_limit_unique'),
+            # NULLs are distinct above, so the default (date=NULL) rows need their own
+            models.UniqueConstraint(
+                fields=['artstyle'], condition=models.Q(date__isnull=True), name='capacity_default_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date or 'Every day'} {self.artstyle or 'all styles'}: {self.max_bookings}"
+
+
+class DailyBookingCount(models.Model):
+    """Pending + accepted bookings per (date, artstyle); artstyle '' is the day total."""
+    date = models.DateField()
+    artstyle = models.CharField(max_length=100, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'artstyle'], name='daily_count_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.artstyle or 'total'}: {self.count}"
+
+
 # ===============================
 # UPLOADED ART MODEL
 # ===============================
 class UploadedArt(models.Model):
+    # The accepted booking this entry was promoted from (at most one entry each)
+    appointment = models.OneToOneField(
+        Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='gallery_entry',
+    )
     client_name = models.CharField(max_length=100)
     contact = models.CharField(max_length=20, blank=True, null=True)
     art = models.ImageField(upload_to='artworks/', null=True, blank=True)
     reference = models.ImageField(upload_to='references/', null=True, blank=True)
     date_uploaded = models.DateTimeField(auto_now_add=True)
 
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
+    IMAGE_FIELDS = ('art', 'reference')
+
     class Meta:
         verbose_name = "Uploaded Art"
         verbose_name_plural = "Uploaded Arts"
@@ -85,6 +188,312 @@ class UploadedArt(models.Model):
         return f"{self.client_name} - {self.date_uploaded.strftime('%Y-%m-%d')}"
 
 
+# ===============================
+# ARCHIVED APPOINTMENTS
+# ===============================
+def archive_storage():
+    return storages['archive']
+
+
+class ArchivedAppointment(models.Model):
+    """
+    A finished Appointment moved out of the hot table by
+    `manage.py archive_appointments` (see booking.archive). Keeps the
+    original id; images live under settings.ARCHIVE_MEDIA_PREFIX.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)
+    fullname = models.CharField(max_length=100)
+    email = models.EmailField(max_length=100)
+    contact = models.CharField(max_length=20)
+    date = models.DateField()
+    artstyle = models.CharField(max_length=100)
+    payment_reference = models.ImageField(max_length=255, storage=archive_storage, null=True, blank=True)
+    art_image = models.ImageField(max_length=255, storage=archive_storage, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Carried over so archived screenshots still count in booking.phash
+    payment_phash = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    archived = True
+    PHASH_FIELDS = Appointment.PHASH_FIELDS
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='archived_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='archived_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='archived_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.fullname} - {self.artstyle} ({self.status}, archived)"
+
+    def is_pending(self):
+        return False
+
+    def is_accepted(self):
+        return self.status == 'Accepted'
+
+
+# ===============================
+# CONTENT-ADDRESSED BLOBS
+# ===============================
+class StoredBlob(models.Model):
+    """One row per unique file held by booking.storage.ContentAddressedStorage."""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} (x{self.refcount})"
+
+
+# ===============================
+# BACKGROUND JOBS
+# ===============================
+class Job(models.Model):
+    """A unit of deferred work picked up by `manage.py run_jobs` (see booking.jobs)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+# ===============================
+# NOTIFICATION OUTBOX
+# ===============================
+class OutboxMessage(models.Model):
+    """
+    An email written in the same transaction as the change it reports and
+    sent later by `manage.py send_notifications` (see booking.notifications).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    key = models.CharField(max_length=200, unique=True)
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True)
+    to = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+# ===============================
+# PAGE VERSIONS (conditional GET)
+# ===============================
+class PageVersion(models.Model):
+    """Change counter per scope ('admin', 'user:<id>'); see booking.conditional."""
+    scope = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+
+
+# ===============================
+# IMAGE DERIVATIVES (signals)
+# ===============================
+@receiver(pre_save, sender=Appointment)
+@receiver(pre_save, sender=UploadedArt)
+def remember_uploaded_images(sender, instance, raw=False, **kwargs):
+    """Keep a handle on freshly uploaded files so post_save can resize them
+    without downloading them back from storage."""
+    if raw:
+        return
+    instance._pending_uploads = {
+        name: getattr(instance, name).file
+        for name in sender.IMAGE_FIELDS
+        if getattr(instance, name) and not getattr(instance, name)._committed
+    }
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=UploadedArt)
+def generate_image_derivatives(sender, instance, created=False, raw=False, **kwargs):
+    """Build thumbnails for new uploads; older rows are backfilled by
+    `manage.py build_derivatives` rather than on every status save."""
+    if raw:
+        return
+    pending = getattr(instance, '_pending_uploads', {})
+    instance._pending_uploads = {}
+
+    derivatives = {
+        name: entry for name, entry in (instance.derivatives or {}).items()
+        if derivatives_for(instance, name)
+    }
+    for name in sender.IMAGE_FIELDS:
+        fieldfile = getattr(instance, name)
+        if not fieldfile or name in derivatives:
+            continue
+        if name not in pending and not created:
+            continue
+        try:
+            derivatives[name] = build_derivatives(fieldfile, source=pending.get(name))
+        except OSError:
+            # Unreadable image or storage hiccup: templates fall back to the original.
+            logger.exception("Could not build derivatives for %s.%s", sender.__name__, name)
+
+    if derivatives != instance.derivatives:
+        instance.derivatives = derivatives
+        sender.objects.filter(pk=instance.pk).update(derivatives=derivatives)
+
+
+# ===============================
+# PAYMENT SCREENSHOT HASHES (signals)
+# ===============================
+@receiver(pre_save, sender=Appointment)
+def hash_payment_screenshot(sender, instance, raw=False, **kwargs):
+    """Hash new uploads while the file is still in hand (uploads.store_files
+    hashes the ones it saves ahead of the row)."""
+    if raw:
+        return
+    for name, target in sender.PHASH_FIELDS.items():
+        fieldfile = getattr(instance, name)
+        if not fieldfile:
+            setattr(instance, target, None)
+        elif not fieldfile._committed:
+            setattr(instance, target, perceptual_hash(fieldfile.file))
+
+
+# ===============================
+# BATCH DELETES (signals)
+# ===============================
+_batch_delete = ContextVar('batch_delete', default=False)
+
+
+@contextmanager
+def batch_delete():
+    """
+    Mute the per-row Appointment post_delete receivers below (capacity,
+    page versions) in this thread. The caller applies
+    their effects once for the whole batch, see archive.archive_batch.
+    """
+    token = _batch_delete.set(True)
+    try:
+        yield
+    finally:
+        _batch_delete.reset(token)
+
+
+# ===============================
+# BOOKING CAPACITY (signals)
+# ===============================
+@receiver(post_init, sender=Appointment)
+def remember_capacity_slot(sender, instance, **kwargs):
+    instance._capacity_slot = capacity.slot_of(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def update_capacity_counts(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._capacity_slot
+    new = capacity.slot_of(instance)
+    if old != new:
+        if old:
+            capacity.release(*old)
+        if new:
+            capacity.reserve(*new, enforce=getattr(instance, 'enforce_capacity', False))
+    instance._capacity_slot = new
+
+
+@receiver(post_delete, sender=Appointment)
+def release_capacity_slot(sender, instance, **kwargs):
+    if _batch_delete.get():
+        return
+    slot = capacity.slot_of(instance)
+    if slot:
+        capacity.release(*slot)
+
+
+# ===============================
+# CACHED AUTH USER (signals)
+# ===============================
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+# ===============================
+# PAGE VERSIONS (signals)
+# ===============================
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def bump_booking_pages(sender, instance, **kwargs):
+    if _batch_delete.get():
+        return
+    conditional.bump('admin', conditional.user_scope(instance.user_id))
+
+
+@receiver(post_save, sender=UploadedArt)
+@receiver(post_delete, sender=UploadedArt)
+def bump_gallery_pages(sender, instance, **kwargs):
+    conditional.bump('admin')
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_user_pages(sender, instance, **kwargs):
+    conditional.bump(conditional.user_scope(instance.pk))
+
+
+# ===============================
+# SEARCH INDEX (signals)
+# ===============================
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    # SQLite only; Postgres indexes come from migration 0013
+    if sender.name == 'booking':
+        search.install_fts(connections[using])
+
+
 # ===============================
 # APPOINTMENT FORM
 # ===============================
@@ -0,0 +1,117 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .jobs import backoff
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================
+# WRITING (request path)
+# ===============================
+def queue_status_emails(appointments):
+    """
+    Add outbox rows telling customers about their booking's new status.
+
+    Call inside the transaction that changes the status, so a message
+    exists exactly when the change commits. Keyed by (booking, status):
+    repeating the same decision queues nothing new.
+    """
+    from .models import OutboxMessage
+
+    rows = []
+    for appointment in appointments:
+        if not appointment.email:
+            continue
+        context = {'appointment': appointment}
+        rows.append(OutboxMessage(
+            key=f"status:{appointment.pk}:{appointment.status}",
+            appointment_id=appointment.pk,
+            to=appointment.email,
+            subject=render_to_string('booking/email/status_subject.txt', context).strip(),
+            body=render_to_string('booking/email/status_body.txt', context),
+        ))
+    OutboxMessage.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+# ===============================
+# DELIVERY (worker)
+# ===============================
+def claim_batch(size):
+    """Take up to `size` due messages, oldest first, for this worker."""
+    from .models import OutboxMessage
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    due = Q(status='pending', run_at__lte=now) | Q(status='sending', locked_at__lt=stale)
+
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.filter(due).select_for_update(skip_locked=True)
+            .order_by('run_at', 'id').values_list('id', flat=True)[:size]
+        )
+        # Conditional on still being due: the guard on backends without
+        # SELECT ... FOR UPDATE (SQLite), as in booking.jobs.claim_next
+        OutboxMessage.objects.filter(due, pk__in=ids).update(
+            status='sending', locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(OutboxMessage.objects.filter(pk__in=ids, status='sending', locked_at=now))
+
+
+def _record_failure(message, error):
+    from .models import OutboxMessage
+
+    if message.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+        OutboxMessage.objects.filter(pk=message.pk).update(status='failed', last_error=error, locked_at=None)
+        logger.error("Notification %s failed permanently", message.pk)
+    else:
+        retry_at = timezone.now() + timedelta(seconds=backoff(message.attempts))
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            status='pending', last_error=error, locked_at=None, run_at=retry_at,
+        )
+        logger.warning("Notification %s failed, retrying at %s", message.pk, retry_at)
+
+
+def deliver_batch(size=None):
+    """
+    Send one batch of due messages over a single mail connection.
+    Returns (sent, failed); (0, 0) means the outbox is empty.
+    """
+    from .models import OutboxMessage
+
+    batch = claim_batch(size or settings.NOTIFICATION_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    sent, failed = [], []
+    try:
+        with get_connection() as connection:
+            for message in batch:
+                email = EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.to])
+                try:
+                    connection.send_messages([email])
+                except Exception:
+                    _record_failure(message, traceback.format_exc())
+                    failed.append(message.pk)
+                else:
+                    sent.append(message.pk)
+    except Exception:
+        # Could not open (or cleanly close) the connection: retry the rest
+        error = traceback.format_exc()
+        for message in batch:
+            if message.pk not in sent and message.pk not in failed:
+                _record_failure(message, error)
+                failed.append(message.pk)
+
+    OutboxMessage.objects.filter(pk__in=sent).update(
+        status='sent', sent_at=timezone.now(), locked_at=None, last_error='',
+    )
+    return len(sent), len(failed)
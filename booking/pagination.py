@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    """Pack a (created_at, id) position into an opaque URL-safe token."""
+    raw = json.dumps([created_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Reverse of encode_cursor(); raises InvalidCursor on tampered input."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise InvalidCursor(token)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a newest-first (created_at, id) ordering.
+
+    Unlike OFFSET pagination every page is a single bounded range scan on
+    the (…, created_at, id) indexes, so page N costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page=25):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, after=None, before=None):
+        if before:
+            return self._page_before(*decode_cursor(before))
+
+        qs = self.queryset.order_by('-created_at', '-id')
+        if after:
+            created_at, pk = decode_cursor(after)
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=self._cursor(rows[-1]) if has_more else None,
+            prev_cursor=self._cursor(rows[0]) if after and rows else None,
+        )
+
+    def _page_before(self, created_at, pk):
+        qs = self.queryset.order_by('created_at', 'id').filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=self._cursor(rows[-1]) if rows else None,
+            prev_cursor=self._cursor(rows[0]) if has_more else None,
+        )
+
+    @staticmethod
+    def _cursor(obj):
+        return encode_cursor(obj.created_at, obj.pk)
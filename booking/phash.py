@@ -0,0 +1,128 @@
+import threading
+import time
+
+from django.conf import settings
+
+MASK = (1 << 64) - 1
+
+
+# ===============================
+# MULTI-INDEX HASH TABLE
+# ===============================
+class HashIndex:
+    """
+    In-memory Hamming-distance index over 64-bit perceptual hashes.
+
+    Each hash is split into max_distance + 1 bit ranges with one dict per
+    range. Two hashes at most max_distance bits apart must agree exactly on
+    at least one range (pigeonhole), so a lookup only compares against the
+    few entries sharing a bucket with the query instead of every hash.
+    """
+
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        parts = max_distance + 1
+        bounds = [round(64 * i / parts) for i in range(parts + 1)]
+        self.ranges = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.ranges]
+        self.hashes = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, key, value):
+        value &= MASK
+        self.hashes[key] = value
+        for (shift, mask), table in zip(self.ranges, self.tables):
+            table.setdefault((value >> shift) & mask, []).append(key)
+
+    def near(self, value, max_distance=None):
+        """Keys whose hash is within `max_distance` bits of `value`."""
+        value &= MASK
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        found = set()
+        for (shift, mask), table in zip(self.ranges, self.tables):
+            for key in table.get((value >> shift) & mask, ()):
+                if key not in found and (self.hashes[key] ^ value).bit_count() <= limit:
+                    found.add(key)
+        return found
+
+
+# ===============================
+# PROCESS-WIDE INDEX
+# ===============================
+_lock = threading.Lock()
+_state = {'index': None, 'built': 0.0, 'last_pk': 0}
+
+
+def _hashed(**filters):
+    """(pk, payment_phash) of hot and archived bookings; archiving keeps the id."""
+    from .models import Appointment, ArchivedAppointment
+
+    for model in (Appointment, ArchivedAppointment):
+        yield model.objects.filter(payment_phash__isnull=False, **filters).values_list('pk', 'payment_phash')
+
+
+def _load(index, after_pk=0):
+    """
+    Add hashes of bookings after `after_pk`. Rows archived since the last
+    call keep their id and hash, so the entry they had stays valid.
+    """
+    last = after_pk
+    for rows in _hashed(pk__gt=after_pk):
+        for pk, value in rows.order_by('pk').iterator(chunk_size=5000):
+            index.add(pk, value)
+            last = max(last, pk)
+    return last
+
+
+def payment_index():
+    """
+    The payment screenshot index for this process. Rebuilt from the
+    database every PHASH_INDEX_TTL seconds (edits and deletions), and topped
+    up with newer bookings on each call in between.
+    """
+    with _lock:
+        if _state['index'] is None or time.monotonic() - _state['built'] > settings.PHASH_INDEX_TTL:
+            index = HashIndex(settings.PHASH_MAX_DISTANCE)
+            _state.update(index=index, built=time.monotonic(), last_pk=_load(index))
+        else:
+            _state['last_pk'] = _load(_state['index'], _state['last_pk'])
+        return _state['index']
+
+
+def possible_reuse(appointments):
+    """
+    {appointment pk: [other booking ids]} for appointments whose payment
+    screenshot looks like another booking's, archived ones included. Candidates from the index are
+    re-checked against their current hash, so stale entries never show.
+    """
+    hashed = {a.pk: a.payment_phash for a in appointments if getattr(a, 'payment_phash', None) is not None}
+    if not hashed:
+        return {}
+    index = payment_index()
+    candidates = {pk: index.near(value) - {pk} for pk, value in hashed.items()}
+    others = set().union(*candidates.values())
+    if not others:
+        return {}
+
+    current = {}
+    for rows in _hashed(pk__in=others):
+        current.update(rows)
+    matches = {}
+    for pk, value in hashed.items():
+        close = sorted(
+            other for other in candidates[pk]
+            if other in current and ((current[other] ^ value) & MASK).bit_count() <= settings.PHASH_MAX_DISTANCE
+        )
+        if close:
+            matches[pk] = close
+    return matches
+
+
+def flag_reused_payments(appointments):
+    """Set `reused_payment` (matching booking ids, or []) on each appointment."""
+    matches = possible_reuse(appointments)
+    for appointment in appointments:
+        appointment.reused_payment = matches.get(appointment.pk, [])
+    return appointments
@@ -0,0 +1,210 @@
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+
+# Minimum query length; shorter input matches too much to be useful
+MIN_QUERY_LENGTH = 2
+
+TOKEN = re.compile(r'\w+')
+
+SearchHit = namedtuple('SearchHit', 'kind obj rank')
+
+
+class SearchPage:
+    def __init__(self, hits, number, has_next):
+        self.hits = hits
+        self.number = number
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.hits)
+
+    def __len__(self):
+        return len(self.hits)
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+
+# ===============================
+# POSTGRES: tsvector + pg_trgm
+# ===============================
+# Must match the expression indexes in migration 0013 exactly, or the planner
+# falls back to a sequential scan.
+APPOINTMENT_DOC = "(fullname || ' ' || email || ' ' || contact || ' ' || artstyle)"
+UPLOAD_DOC = "client_name"
+
+POSTGRES_SQL = f"""
+    WITH q AS (SELECT to_tsquery('simple', %(tsquery)s) AS query)
+    SELECT kind, id, rank FROM (
+        SELECT 'appointment' AS kind, id,
+               ts_rank(to_tsvector('simple', {APPOINTMENT_DOC}), q.query)
+               + word_similarity(%(raw)s, {APPOINTMENT_DOC}) AS rank
+        FROM booking_appointment, q
+        WHERE to_tsvector('simple', {APPOINTMENT_DOC}) @@ q.query
+           OR %(raw)s <%% {APPOINTMENT_DOC}
+        UNION ALL
+        SELECT 'upload' AS kind, id,
+               ts_rank(to_tsvector('simple', {UPLOAD_DOC}), q.query)
+               + word_similarity(%(raw)s, {UPLOAD_DOC}) AS rank
+        FROM booking_uploadedart, q
+        WHERE to_tsvector('simple', {UPLOAD_DOC}) @@ q.query
+           OR %(raw)s <%% {UPLOAD_DOC}
+    ) hits
+    ORDER BY rank DESC, id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+
+def _postgres_ids(tokens, raw, limit, offset):
+    # Every token must match, each as a prefix ("mar" finds "maria")
+    tsquery = ' & '.join(f"{token}:*" for token in tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_SQL, {'tsquery': tsquery, 'raw': raw, 'limit': limit, 'offset': offset})
+        return cursor.fetchall()
+
+
+# ===============================
+# SQLITE: FTS5 (local runs)
+# ===============================
+# External-content FTS tables kept in sync by triggers, so bulk_create and
+# raw updates are indexed too.
+FTS_TABLES = {
+    'booking_appointment': ('fullname', 'email', 'contact', 'artstyle'),
+    'booking_uploadedart': ('client_name',),
+}
+
+SQLITE_SQL = """
+    SELECT 'appointment', rowid, -bm25(booking_appointment_fts) AS rank
+    FROM booking_appointment_fts WHERE booking_appointment_fts MATCH %s
+    UNION ALL
+    SELECT 'upload', rowid, -bm25(booking_uploadedart_fts) AS rank
+    FROM booking_uploadedart_fts WHERE booking_uploadedart_fts MATCH %s
+    ORDER BY rank DESC, 2 DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+_fts5_support = {}
+
+
+def has_fts5(conn):
+    if conn.vendor != 'sqlite':
+        return False
+    if conn.alias not in _fts5_support:
+        with conn.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            _fts5_support[conn.alias] = any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+    return _fts5_support[conn.alias]
+
+
+def install_fts(conn):
+    """
+    Create the FTS5 tables and sync triggers if missing (SQLite only).
+
+    Runs after every migrate: SQLite migrations rebuild altered tables, which
+    drops their triggers, so they are recreated and the index rebuilt.
+    """
+    if not has_fts5(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+
+        for table, columns in FTS_TABLES.items():
+            fts = f"{table}_fts"
+            cols = ', '.join(columns)
+            new = ', '.join(f"new.{c}" for c in columns)
+            old = ', '.join(f"old.{c}" for c in columns)
+            if {f"{fts}_ai", f"{fts}_ad", f"{fts}_au"} <= triggers:
+                continue
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+            )
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _sqlite_ids(tokens, limit, offset):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_SQL, [match, match, limit, offset])
+        return cursor.fetchall()
+
+
+# ===============================
+# FALLBACK: icontains (unranked)
+# ===============================
+def _basic_ids(tokens, limit, offset):
+    from .models import Appointment, UploadedArt
+
+    appointments, uploads = Q(), Q()
+    for token in tokens:
+        appointments &= (
+            Q(fullname__icontains=token) | Q(email__icontains=token)
+            | Q(contact__icontains=token) | Q(artstyle__icontains=token)
+        )
+        uploads &= Q(client_name__icontains=token)
+    window = limit + offset
+    rows = [
+        ('appointment', pk, 0.0)
+        for pk in Appointment.objects.filter(appointments).order_by('-id').values_list('id', flat=True)[:window]
+    ] + [
+        ('upload', pk, 0.0)
+        for pk in UploadedArt.objects.filter(uploads).order_by('-id').values_list('id', flat=True)[:window]
+    ]
+    return rows[offset:window]
+
+
+# ===============================
+# PUBLIC API
+# ===============================
+def search(query, page=1, per_page=25):
+    """
+    Ranked matches for `query` across appointments (name, email, contact,
+    art style) and gallery uploads (client name), one page at a time.
+    """
+    from .models import Appointment, UploadedArt
+
+    tokens = [token.lower() for token in TOKEN.findall(query or '')]
+    page = max(int(page), 1)
+    if len(''.join(tokens)) < MIN_QUERY_LENGTH:
+        return SearchPage([], page, False)
+
+    # One extra row tells us whether there is a next page without a COUNT
+    limit, offset = per_page + 1, (page - 1) * per_page
+    if connection.vendor == 'postgresql':
+        rows = _postgres_ids(tokens, ' '.join(tokens), limit, offset)
+    elif has_fts5(connection):
+        rows = _sqlite_ids(tokens, limit, offset)
+    else:
+        rows = _basic_ids(tokens, limit, offset)
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    objects = {
+        'appointment': Appointment.objects.in_bulk([pk for kind, pk, _ in rows if kind == 'appointment']),
+        'upload': UploadedArt.objects.in_bulk([pk for kind, pk, _ in rows if kind == 'upload']),
+    }
+    hits = [
+        SearchHit(kind, objects[kind][pk], rank)
+        for kind, pk, rank in rows
+        if pk in objects[kind]
+    ]
+    return SearchPage(hits, page, has_next)
@@ -0,0 +1,245 @@
+import fnmatch
+import hashlib
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .images import render_static_variants
+from .metrics import InstrumentedStorage
+
+
+def content_hash(content):
+    """sha256 hex digest of a File, read in chunks and rewound afterwards."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    """
+    Deduplicating wrapper around another storage backend.
+
+    Blobs are named `<upload_to>/<sha256><ext>`. Saving bytes we already
+    hold skips the upload and bumps a reference count in StoredBlob;
+    delete() only removes the underlying blob once the last reference is
+    released. Names that predate this backend pass straight through.
+    """
+
+    def __init__(self, backend='django.core.files.storage.FileSystemStorage', options=None):
+        self.backend = backend
+        self.options = options or {}
+        self._inner = None
+
+    @property
+    def inner(self):
+        if self._inner is None:
+            self._inner = InstrumentedStorage(import_string(self.backend)(**self.options))
+        return self._inner
+
+    # --- naming -----------------------------------------------------
+    def get_available_name(self, name, max_length=None):
+        # The final name is decided by content in _save(); never probe the
+        # remote backend for collisions here.
+        return name
+
+    def _blob_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f"{digest}{ext}")
+
+    # --- writes -----------------------------------------------------
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        # Files from images.normalize_upload (and any booking upload kept as
+        # streamed by CappedImageUploadHandler) arrive pre-hashed.
+        digest = getattr(content, 'sha256', None) or content_hash(content)
+        if self.retain_digest(digest):
+            return StoredBlob.objects.values_list('name', flat=True).get(sha256=digest)
+
+        stored = self.inner.save(self._blob_name(name, digest), content)
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=stored, sha256=digest, size=content.size, refcount=1)
+            return stored
+        except IntegrityError:
+            # Someone uploaded the same bytes concurrently; keep theirs.
+            self.retain_digest(digest)
+            blob_name = StoredBlob.objects.values_list('name', flat=True).get(sha256=digest)
+            if blob_name != stored:
+                self.inner.delete(stored)
+            return blob_name
+
+    def retain_digest(self, digest):
+        from .models import StoredBlob
+        return StoredBlob.objects.filter(sha256=digest).update(refcount=F('refcount') + 1) > 0
+
+    def retain(self, name):
+        """Record another reference to an existing blob (e.g. a row sharing a file)."""
+        from .models import StoredBlob
+        StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+    def delete(self, name):
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return self.inner.delete(name)
+            if blob.refcount > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            blob.delete()
+        self.inner.delete(name)
+
+    # --- reads (delegated) ------------------------------------------
+    def _open(self, name, mode='rb'):
+        return self.inner.open(name, mode)
+
+    def exists(self, name):
+        return self.inner.exists(name)
+
+    def url(self, name):
+        return self.inner.url(name)
+
+    def size(self, name):
+        return self.inner.size(name)
+
+    def path(self, name):
+        return self.inner.path(name)
+
+    def listdir(self, path):
+        return self.inner.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.inner.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.inner.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.inner.get_modified_time(name)
+
+
+def retain_shared_files(fieldfiles):
+    """
+    Bump reference counts when other rows start pointing at existing blobs
+    (e.g. gallery entries sharing an appointment's files). Issues one UPDATE
+    per distinct increment.
+    """
+    from .models import StoredBlob
+
+    counts = Counter(
+        f.name for f in fieldfiles
+        if f and isinstance(f.storage, ContentAddressedStorage)
+    )
+    by_increment = defaultdict(list)
+    for name, count in counts.items():
+        by_increment[count].append(name)
+    for increment, names in by_increment.items():
+        StoredBlob.objects.filter(name__in=names).update(refcount=F('refcount') + increment)
+
+
+class LatencyStorage(FileSystemStorage):
+    """
+    FileSystemStorage that sleeps settings.MEDIA_LATENCY_MS on every remote-
+    style call: a local stand-in for Cloudinary when measuring upload paths
+    (MEDIA_STORAGE=slow).
+    """
+
+    def _delay(self):
+        time.sleep(settings.MEDIA_LATENCY_MS / 1000)
+
+    def _save(self, name, content):
+        self._delay()
+        return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        self._delay()
+        return super()._open(name, mode)
+
+    def exists(self, name):
+        self._delay()
+        return super().exists(name)
+
+    def delete(self, name):
+        self._delay()
+        return super().delete(name)
+
+
+VARIANT = re.compile(r'^(?P<stem>.+)\.(?P<width>\d+)w\.(?P<ext>webp|avif)$')
+
+
+class ResponsiveStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise's manifest storage, plus AVIF/WebP width variants of the
+    images matching STATIC_IMAGE_PATTERNS (images/pet.jpg ->
+    images/pet.480w.avif, ...). Variants are rendered into STATIC_ROOT
+    before hashing, so they get hashed names and manifest entries like any
+    other file; {% static_picture %} reads them back from the manifest.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, (storage, path) in list(paths.items()):
+                if any(fnmatch.fnmatch(name, pattern) for pattern in settings.STATIC_IMAGE_PATTERNS):
+                    for variant in self.render_variants(name, storage, path):
+                        paths[variant] = (self, variant)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def render_variants(self, name, storage, path):
+        """Variant names for one source image, re-rendered only when the source is newer."""
+        existing = [
+            n for n in self.listdir(os.path.dirname(name) or '.')[1]
+            if VARIANT.match(n) and VARIANT.match(n)['stem'] == os.path.splitext(os.path.basename(name))[0]
+        ]
+        source_changed = storage.get_modified_time(path)
+        if existing and all(
+            self.get_modified_time(os.path.join(os.path.dirname(name), n)) >= source_changed for n in existing
+        ):
+            return [os.path.join(os.path.dirname(name), n) for n in existing]
+
+        rendered = []
+        with storage.open(path) as source:
+            for variant, data in render_static_variants(name, source):
+                if self.exists(variant):
+                    self.delete(variant)
+                self._save(variant, ContentFile(data))
+                rendered.append(variant)
+        return rendered
+
+    def image_variants(self, name):
+        """
+        {'avif': [(width, url), ...], 'webp': [...]} for a static image,
+        narrowest first; {} when collectstatic made none.
+        """
+        if self._variant_index is None or self._variant_index[0] is not self.hashed_files:
+            index = defaultdict(lambda: defaultdict(list))
+            for key in self.hashed_files:
+                match = VARIANT.match(key)
+                if match:
+                    index[match['stem']][match['ext']].append((int(match['width']), key))
+            self._variant_index = (self.hashed_files, index)
+        variants = self._variant_index[1].get(os.path.splitext(name)[0], {})
+        return {
+            ext: [(width, self.url(key)) for width, key in sorted(entries)]
+            for ext, entries in variants.items()
+        }
+
+    _variant_index = None
@@ -0,0 +1,18 @@
+from django.db import transaction
+
+from . import gallery
+from .jobs import task
+from .models import Appointment
+
+
+@task('promote_to_gallery')
+def promote_to_gallery(appointment_id):
+    """Copy an accepted appointment's images into the admin gallery."""
+    with transaction.atomic():
+        appointment = (
+            Appointment.objects.select_for_update()
+            .filter(pk=appointment_id, status='Accepted')
+            .first()
+        )
+        if appointment is not None:
+            gallery.promote(appointment)
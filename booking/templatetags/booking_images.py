@@ -0,0 +1,73 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from booking.images import derivatives_for
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(instance, field_name, sizes='(max-width: 600px) 100vw, 320px', **attrs):
+    """
+    Render a lazy <img> for an ImageField using its stored thumbnails.
+
+    The full-size URL is kept in data-full for the lightbox, so the original
+    is only downloaded when someone actually opens it. Rows without
+    derivatives yet (old uploads) fall back to the original image.
+
+        {% responsive_img art 'art' alt="Client art" onclick="openLightbox(this.dataset.full)" %}
+    """
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile:
+        return ''
+
+    full_url = fieldfile.url
+    entry = derivatives_for(instance, field_name)
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+
+    if not entry:
+        return format_html(
+            '<img src="{}" data-full="{}" loading="lazy" decoding="async"{}>',
+            full_url, full_url, extra,
+        )
+
+    storage = fieldfile.storage
+    srcset = ', '.join(
+        f"{storage.url(entry[label])} {width}w"
+        for label, width in settings.IMAGE_DERIVATIVES.items()
+        if label in entry
+    )
+    smallest = min(settings.IMAGE_DERIVATIVES, key=settings.IMAGE_DERIVATIVES.get)
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" data-full="{}" loading="lazy" decoding="async"{}>',
+        storage.url(entry[smallest]), srcset, sizes, full_url, extra,
+    )
+
+
+@register.simple_tag
+def static_picture(path, sizes='(max-width: 600px) 100vw, 50vw', **attrs):
+    """
+    Render a <picture> for a static image with the AVIF/WebP variants that
+    collectstatic generated (booking.storage.ResponsiveStaticFilesStorage).
+    The original stays as the <img> fallback, so without variants (runserver
+    before collectstatic, other storages) this is a plain lazy <img>.
+
+        {% static_picture 'images/pet.jpg' alt="Pet Illustration" data_title="Pet Illustration" %}
+
+    Underscores in attribute names become hyphens (data_title -> data-title).
+    """
+    attrs.setdefault('loading', 'lazy')
+    extra = format_html_join('', ' {}="{}"', sorted((k.replace('_', '-'), v) for k, v in attrs.items()))
+    img = format_html('<img src="{}" decoding="async"{}>', static(path), extra)
+
+    variants = getattr(staticfiles_storage, 'image_variants', lambda name: {})(path)
+    if not variants:
+        return img
+    sources = format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', (
+        (f"image/{ext}", ', '.join(f"{url} {width}w" for width, url in variants[ext]), sizes)
+        for ext in ('avif', 'webp') if ext in variants
+    ))
+    return format_html('<picture>{}{}</picture>', sources, img)
@@ -1,3 +1,605 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+from django.core.files.uploadhandler import SkipFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import capacity, conditional, uploads
+from .archive import archive_batch
+from .caching import get_cached_user, get_latest_booking
+from .gallery import promote
+from .images import derivative_names, normalize_upload
+from .jobs import claim_next, enqueue
+from .models import (
+    Appointment, ArchivedAppointment, CapacityLimit, CustomUser, DailyBookingCount, Job, OutboxMessage,
+    StoredBlob, UploadedArt,
+)
+from .pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .storage import ContentAddressedStorage
+from .uploadhandlers import CappedImageUploadHandler
+from .uploads import save_with_uploads
+
+
+def image_bytes(size=(120, 90), fmt='PNG', **save_options):
+    out = BytesIO()
+    Image.new('RGB', size, (200, 120, 80)).save(out, fmt, **save_options)
+    return out.getvalue()
+
+
+def make_appointment(user, **fields):
+    """A booking with no images (nothing reaches media storage)."""
+    defaults = {
+        'fullname': 'Test Client', 'email': user.email, 'contact': '09000000000',
+        'date': date(2031, 1, 1), 'artstyle': Appointment.ART_STYLES[0],
+    }
+    return Appointment.objects.create(user=user, **{**defaults, **fields})
+
+
+# ===============================
+# STARTUP BUDGET
+# ===============================
+class StartupBudgetTests(SimpleTestCase):
+    def test_cold_start_within_budget(self):
+        # Lazy startup is what Vercel runs; CommandError fails the run when over COLD_START_BUDGET_MS
+        call_command('profile_startup', lazy='on', enforce=True, runs=3, stdout=StringIO())
+
+
+# ===============================
+# KEYSET PAGINATION
+# ===============================
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+        base = timezone.now()
+        for i in range(8):
+            appointment = make_appointment(user)
+            # Pairs share a timestamp so the id tie-breaker is exercised
+            Appointment.objects.filter(pk=appointment.pk).update(created_at=base - timedelta(minutes=i // 2))
+        self.newest_first = list(
+            Appointment.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+        self.paginator = KeysetPaginator(Appointment.objects.all(), per_page=3)
+
+    def ids(self, page):
+        return [a.pk for a in page]
+
+    def test_forward_and_back(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next:
+            pages.append(self.paginator.page(after=pages[-1].next_cursor))
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.newest_first)
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertFalse(pages[0].has_previous)
+
+        # Walking back from the last page returns the same pages
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(self.paginator.page(before=back[-1].prev_cursor))
+        self.assertEqual([self.ids(page) for page in reversed(back)], [self.ids(page) for page in pages])
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor')
+
+
+# ===============================
+# CONTENT-ADDRESSED STORAGE
+# ===============================
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = ContentAddressedStorage(options={'location': tmp.name})
+
+    def refcount(self, name):
+        return StoredBlob.objects.get(name=name).refcount
+
+    def test_identical_bytes_share_one_blob(self):
+        first = self.storage.save('art_uploads/a.png', ContentFile(b'same bytes'))
+        second = self.storage.save('references/b.png', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        self.assertEqual(self.refcount(first), 2)
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path(first))), [os.path.basename(first)])
+
+        other = self.storage.save('art_uploads/c.png', ContentFile(b'other bytes'))
+        self.assertNotEqual(other, first)
+        self.assertEqual(self.refcount(other), 1)
+
+    def test_file_removed_with_last_reference(self):
+        name = self.storage.save('art_uploads/a.png', ContentFile(b'shared'))
+        self.storage.retain(name)
+        self.assertEqual(self.refcount(name), 2)
+
+        self.storage.delete(name)
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(self.storage.exists(name))
+
+        self.storage.delete(name)
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertFalse(self.storage.exists(name))
+
+
+# ===============================
+# JOB CLAIMS
+# ===============================
+class JobClaimTests(TestCase):
+    def test_stale_read_cannot_claim_twice(self):
+        job = enqueue('promote_to_gallery', {'appointment_id': 1})
+        # A second worker read the row before the first one claimed it
+        stale = Job.objects.get(pk=job.pk)
+
+        claimed = claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        with mock.patch.object(QuerySet, 'first', return_value=stale):
+            self.assertIsNone(claim_next())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+
+    def test_idempotency_key_queues_once(self):
+        first = enqueue('promote_to_gallery', {'appointment_id': 1}, key='promote:1')
+        second = enqueue('promote_to_gallery', {'appointment_id': 1}, key='promote:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class ConcurrentJobClaimTests(TransactionTestCase):
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_workers_never_share_a_job(self):
+        jobs = {enqueue('promote_to_gallery', {'appointment_id': i}).pk for i in range(40)}
+        claimed, start = [], threading.Barrier(4)
+
+        def worker():
+            start.wait()
+            try:
+                while (job := claim_next()) is not None:
+                    claimed.append(job.pk)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertCountEqual(claimed, jobs)
+
+
+# ===============================
+# BOOKING CAPACITY
+# ===============================
+class CapacityTests(TestCase):
+    day = date(2031, 3, 1)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+        CapacityLimit.objects.create(date=None, artstyle='', max_bookings=2)
+
+    def book(self):
+        appointment = Appointment(
+            user=self.user, fullname='Test Client', email=self.user.email, contact='09000000000',
+            date=self.day, artstyle=Appointment.ART_STYLES[0],
+        )
+        appointment.enforce_capacity = True
+        with transaction.atomic():
+            appointment.save()
+        return appointment
+
+    def day_count(self):
+        return DailyBookingCount.objects.get(date=self.day, artstyle='').count
+
+    def test_full_day_rejects_booking(self):
+        first = self.book()
+        self.book()
+        self.assertFalse(capacity.is_available(self.day, Appointment.ART_STYLES[0]))
+
+        with self.assertRaises(capacity.CapacityFull):
+            self.book()
+        self.assertEqual(Appointment.objects.filter(date=self.day).count(), 2)
+        self.assertEqual(self.day_count(), 2)
+
+        # Denying a booking frees its slot
+        first.status = 'Denied'
+        first.save()
+        self.assertEqual(self.day_count(), 1)
+        self.assertTrue(capacity.is_available(self.day, Appointment.ART_STYLES[0]))
+        self.book()
+
+    def test_one_default_limit_per_artstyle(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CapacityLimit.objects.create(date=None, artstyle='', max_bookings=5)
+        CapacityLimit.objects.create(date=self.day, artstyle='', max_bookings=5)
+
+
+# ===============================
+# BOOKING UPLOADS
+# ===============================
+class UploadStorageMixin:
+    """Appointment image fields on a throwaway content-addressed storage."""
+    day = date(2031, 3, 1)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = ContentAddressedStorage(options={'location': tmp.name})
+        for name in Appointment.IMAGE_FIELDS:
+            patcher = mock.patch.object(Appointment._meta.get_field(name), 'storage', self.storage)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+
+    def book(self, **images):
+        appointment = Appointment(
+            user=self.user, fullname='Test Client', email=self.user.email, contact='09000000000',
+            date=self.day, artstyle=Appointment.ART_STYLES[0],
+            **{name: ContentFile(data, name=f"{name}.png") for name, data in images.items()},
+        )
+        appointment.enforce_capacity = True
+        save_with_uploads(appointment)
+
+    def stored_files(self):
+        return [os.path.join(root, f) for root, _, files in os.walk(self.storage.inner.location) for f in files]
+
+
+class SaveWithUploadsTests(UploadStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        CapacityLimit.objects.create(date=None, artstyle='', max_bookings=0)
+
+    def test_capacity_full_leaves_nothing_stored(self):
+        # Inside a transaction store_files() falls back to uploading in save()
+        with self.assertRaises(capacity.CapacityFull):
+            self.book(art_image=image_bytes())
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_capacity_full_keeps_shared_blob(self):
+        data = image_bytes()
+        shared = self.storage.save('artworks/existing.png', ContentFile(data))
+        with self.assertRaises(capacity.CapacityFull):
+            self.book(art_image=data)
+        self.assertEqual(StoredBlob.objects.get(name=shared).refcount, 1)
+        self.assertTrue(self.storage.exists(shared))
+
+
+@override_settings(PARALLEL_UPLOADS=True)
+class ParallelUploadTests(UploadStorageMixin, TransactionTestCase):
+    def book_failing_reference(self, wait_for=None):
+        """Book two images while storing the payment reference fails (after `wait_for` is set)."""
+        real_save = ContentAddressedStorage._save
+
+        def save(storage, name, content):
+            if name.startswith('references/'):
+                if wait_for is not None:
+                    wait_for.wait(timeout=10)
+                raise OSError("storage unavailable")
+            return real_save(storage, name, content)
+
+        with mock.patch.object(ContentAddressedStorage, '_save', save):
+            with self.assertRaises(OSError):
+                self.book(art_image=image_bytes(), payment_reference=image_bytes((90, 120)))
+        self.assertFalse(Appointment.objects.exists())
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_failed_upload_cancels_the_others(self):
+        self.book_failing_reference()
+
+    def test_failed_upload_releases_finished_ones(self):
+        finished, real_build = threading.Event(), uploads.build_derivatives
+
+        def build(*args, **kwargs):
+            try:
+                return real_build(*args, **kwargs)
+            finally:
+                finished.set()
+
+        with mock.patch.object(uploads, 'build_derivatives', build):
+            self.book_failing_reference(wait_for=finished)
+
+    def test_both_files_stored(self):
+        self.book(art_image=image_bytes(), payment_reference=image_bytes((90, 120)))
+        appointment = Appointment.objects.get()
+        self.assertEqual(appointment.art_image.name.split('/')[0], 'art_uploads')
+        self.assertEqual(set(appointment.derivatives), set(Appointment.IMAGE_FIELDS))
+        self.assertIsNotNone(appointment.payment_phash)
+
+
+# ===============================
+# ARCHIVING
+# ===============================
+class ArchiveTests(TestCase):
+    def setUp(self):
+        hot, cold = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(hot.cleanup)
+        self.addCleanup(cold.cleanup)
+        media = override_settings(STORAGES={
+            **settings.STORAGES,
+            'default': {
+                'BACKEND': 'booking.storage.ContentAddressedStorage',
+                'OPTIONS': {'options': {'location': hot.name}},
+            },
+            'archive': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': cold.name}},
+        })
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+
+    def finished_booking(self, status):
+        appointment = make_appointment(self.user, status=status, art_image=ContentFile(image_bytes(), name='art.png'))
+        Appointment.objects.filter(pk=appointment.pk).update(
+            created_at=timezone.now() - timedelta(days=400), date=date(2020, 1, 1),
+        )
+        appointment.refresh_from_db()
+        return appointment
+
+    def references(self, appointment):
+        # Small images render identical thumb and medium blobs, one reference each
+        return Counter([appointment.art_image.name, *derivative_names(appointment.derivatives)])
+
+    def refcounts(self, appointment):
+        return {
+            name: StoredBlob.objects.filter(name=name).values_list('refcount', flat=True).first()
+            for name in self.references(appointment)
+        }
+
+    def archive(self, appointment):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_batch([appointment.pk]), 1)
+
+    def test_releases_original_and_thumbnails(self):
+        appointment = self.finished_booking('Denied')
+        self.assertGreater(len(derivative_names(appointment.derivatives)), 0)
+        self.assertEqual(self.refcounts(appointment), self.references(appointment))
+
+        self.archive(appointment)
+        self.assertEqual(set(self.refcounts(appointment).values()), {None})
+        self.assertFalse(StoredBlob.objects.exists())
+        archived = ArchivedAppointment.objects.get(pk=appointment.pk)
+        self.assertTrue(storages['archive'].exists(archived.art_image.name))
+
+    def test_gallery_entry_keeps_shared_files(self):
+        appointment = self.finished_booking('Accepted')
+        with transaction.atomic():
+            promote(appointment)
+        before = self.refcounts(appointment)
+
+        self.archive(appointment)
+        after = self.refcounts(appointment)
+        self.assertEqual(after.pop(appointment.art_image.name), before.pop(appointment.art_image.name) - 1)
+        self.assertEqual(after, before)             # the entry took over the thumbnails' reference
+        self.assertTrue(default_storage.exists(appointment.art_image.name))
+
+
+# ===============================
+# ACCEPTING BOOKINGS
+# ===============================
+class AcceptBookingTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_superuser('owner', 'owner@example.com', 'x')
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(admin)
+        self.appointment = make_appointment(CustomUser.objects.create_user('client', 'client@example.com', 'x'))
+
+    def test_double_accept_queues_once(self):
+        url = reverse('accept_booking', args=[self.appointment.pk])
+        self.client.get(url)
+        response = self.client.get(url, follow=True)
+
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, 'Accepted')
+        self.assertEqual(Job.objects.filter(task='promote_to_gallery').count(), 1)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertIn("already accepted", [str(m) for m in response.context['messages']][-1])
+
+    def test_bulk_accept_skips_accepted(self):
+        self.client.get(reverse('accept_booking', args=[self.appointment.pk]))
+        response = self.client.post(
+            reverse('bulk_booking_action'), {'action': 'accept', 'ids': [self.appointment.pk]},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json()['results'], {str(self.appointment.pk): 'skipped (already accepted)'})
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+# ===============================
+# CACHE INVALIDATION
+# ===============================
+class LatestBookingCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+        self.appointment = make_appointment(self.user)
+
+    def latest(self):
+        # A fresh request each time; the memo lives on the request
+        return get_latest_booking(SimpleNamespace(user=self.user))
+
+    def test_cached_between_requests(self):
+        self.assertEqual(self.latest().status, 'Pending')
+        Appointment.objects.filter(pk=self.appointment.pk).update(status='Denied')
+        with self.assertNumQueries(1):                 # the PageVersion lookup only
+            self.assertEqual(self.latest().status, 'Pending')
+
+    def test_write_on_another_instance_is_seen(self):
+        self.assertEqual(self.latest().status, 'Pending')
+        # Another instance's accept: its local cache is not ours, only the bump is shared
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.filter(pk=self.appointment.pk).update(status='Accepted')
+            conditional.bump(conditional.user_scope(self.user.pk))
+        self.assertEqual(self.latest().status, 'Accepted')
+
+    def test_deny_view_changes_latest_booking(self):
+        self.assertEqual(self.latest().status, 'Pending')
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(CustomUser.objects.create_superuser('owner', 'owner@example.com', 'x'))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.get(reverse('deny_booking', args=[self.appointment.pk]))
+        self.assertEqual(self.latest().status, 'Denied')
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+        self.load = mock.Mock(side_effect=lambda pk: CustomUser.objects.get(pk=pk))
+
+    def test_loaded_once(self):
+        get_cached_user(self.user.pk, self.load)
+        get_cached_user(self.user.pk, self.load)
+        self.assertEqual(self.load.call_count, 1)
+
+    def test_dropped_on_save(self):
+        get_cached_user(self.user.pk, self.load)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(get_cached_user(self.user.pk, self.load).first_name, 'Renamed')
+        self.assertEqual(self.load.call_count, 2)
+
+
+# ===============================
+# CONDITIONAL GET
+# ===============================
+# Pages render without collectstatic's manifest
+@override_settings(STORAGES={
+    **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('client', 'client@example.com', 'x')
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(self.user)
+
+    def etag(self, name):
+        # The first visit sets the CSRF cookie, which is part of the ETag
+        self.client.get(reverse(name))
+        return self.client.get(reverse(name))['ETag']
+
+    def test_unchanged_page_is_not_modified(self):
+        etag = self.etag('gallery')
+        response = self.client.get(reverse('gallery'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_booking_write_changes_etag(self):
+        etag = self.etag('gallery')
+        with self.captureOnCommitCallbacks(execute=True):
+            make_appointment(self.user)
+        response = self.client.get(reverse('gallery'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_gallery_upload_changes_admin_gallery_etag(self):
+        self.client.force_login(CustomUser.objects.create_superuser('owner', 'owner@example.com', 'x'))
+        etag = self.etag('admin_gallery')
+        with self.captureOnCommitCallbacks(execute=True):
+            UploadedArt.objects.create(client_name='Walk-in', contact='09000000000')
+        response = self.client.get(reverse('admin_gallery'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+# ===============================
+# UPLOAD HANDLER
+# ===============================
+@override_settings(UPLOAD_LIMITS={'default': {'max_bytes': 512 * 1024, 'max_pixels': 1_000_000}})
+class CappedImageUploadHandlerTests(SimpleTestCase):
+    def upload(self, data, chunk_size=64 * 1024, declared_length=True):
+        """Stream `data` through the handler like Django does; returns (file or None, errors)."""
+        request = SimpleNamespace()
+        handler = CappedImageUploadHandler(request)
+        try:
+            handler.new_file('art_image', 'art.jpg', 'image/jpeg', len(data) if declared_length else None)
+            for start in range(0, len(data), chunk_size):
+                handler.receive_data_chunk(data[start:start + chunk_size], start)
+        except SkipFile:
+            return None, request.upload_errors
+        upload = handler.file_complete(len(data))
+        if upload is not None:
+            self.addCleanup(upload.close)
+        return upload, request.upload_errors
+
+    def test_accepts_image_and_hashes_while_streaming(self):
+        data = image_bytes()
+        upload, errors = self.upload(data)
+        self.assertEqual(errors, {})
+        self.assertEqual(upload.image_size, (120, 90))
+        self.assertEqual(upload.sha256, hashlib.sha256(data).hexdigest())
+
+    def test_accepts_jpeg_with_large_icc_profile(self):
+        # 100 KB ICC profile: the frame header sits past the first chunk
+        data = image_bytes((1000, 800), 'JPEG', icc_profile=os.urandom(100 * 1024))
+        upload, errors = self.upload(data)
+        self.assertEqual(errors, {})
+        self.assertEqual(upload.image_size, (1000, 800))
+
+    def test_rejects_non_image(self):
+        upload, errors = self.upload(b'not an image at all' * 100)
+        self.assertIsNone(upload)
+        self.assertEqual(errors, {'art_image': "Upload a valid image."})
+
+    def test_rejects_over_byte_cap(self):
+        data = image_bytes() + os.urandom(600 * 1024)
+        for declared_length in (True, False):
+            upload, errors = self.upload(data, declared_length=declared_length)
+            self.assertIsNone(upload)
+            self.assertIn("larger than", errors['art_image'])
+
+    def test_rejects_over_pixel_cap(self):
+        upload, errors = self.upload(image_bytes((2000, 1000)))
+        self.assertIsNone(upload)
+        self.assertIn("limit is 1,000,000 pixels", errors['art_image'])
+
+
+# ===============================
+# INGEST NORMALIZATION
+# ===============================
+class NormalizeUploadTests(TestCase):
+    def test_downsizes_strips_metadata_and_hashes(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6                      # rotate 90° on display
+        exif[0x010F] = 'PhoneMaker'
+        source = BytesIO(image_bytes((3000, 2000), 'JPEG', exif=exif.tobytes()))
+        source.name = 'IMG_0001.JPG'
+
+        normalized = normalize_upload(source, max_dimension=1600, fmt='WEBP', quality=75)
+        self.assertEqual(normalized.name, 'IMG_0001.webp')
+        data = normalized.read()
+        self.assertEqual(normalized.sha256, hashlib.sha256(data).hexdigest())
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (1067, 1600))   # orientation applied, then fitted
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_storage_reuses_the_digest(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        storage = ContentAddressedStorage(options={'location': tmp.name})
+        source = BytesIO(image_bytes())
+        source.name = 'ref.png'
+        normalized = normalize_upload(source, max_dimension=64, fmt='WEBP', quality=75)
+
+        with mock.patch('booking.storage.content_hash') as content_hash:
+            name = storage.save('references/ref.webp', normalized)
+        content_hash.assert_not_called()
+        self.assertEqual(name, f"references/{normalized.sha256}.webp")
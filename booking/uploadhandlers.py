@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageFile
+
+class SpooledUpload:
+    """
+    Memory buffer that moves to a named temp file past `max_memory` bytes.
+
+    Unlike tempfile.SpooledTemporaryFile the rolled-over file has a path,
+    so forms.ImageField can validate it from disk instead of copying the
+    whole upload into a BytesIO.
+    """
+
+    def __init__(self, max_memory):
+        self.max_memory = max_memory
+        self.file = BytesIO()
+        self.path = None
+
+    def write(self, data):
+        if self.path is None and self.file.tell() + len(data) > self.max_memory:
+            disk = tempfile.NamedTemporaryFile(
+                suffix='.upload', dir=settings.FILE_UPLOAD_TEMP_DIR, delete=False,
+            )
+            disk.write(self.file.getvalue())
+            self.file = disk
+            self.path = disk.name
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload whose sha256 and pixel size were computed while streaming."""
+
+    def __init__(self, spool, name, content_type, size, charset, content_type_extra, sha256, image_size):
+        super().__init__(spool.file, name, content_type, size, charset, content_type_extra)
+        self.spool = spool
+        self.sha256 = sha256
+        self.image_size = image_size
+        if spool.path:
+            self.temporary_file_path = lambda: spool.path
+
+    def close(self):
+        try:
+            return self.spool.close()
+        except FileNotFoundError:
+            pass
+
+
+class CappedImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler for the booking form's image fields.
+
+    Streams each file into a SpooledUpload while hashing it, parses the image
+    header as soon as enough of it has arrived and skips the rest of a file as soon as it
+    exceeds the per-field byte or pixel cap in settings.UPLOAD_LIMITS.
+    Rejections are recorded in request.upload_errors for the view to show.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        if request is not None:
+            request.upload_errors = {}
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.spool = None
+        limits = settings.UPLOAD_LIMITS.get(field_name, settings.UPLOAD_LIMITS['default'])
+        self.max_bytes = limits['max_bytes']
+        self.max_pixels = limits['max_pixels']
+        if content_length and content_length > self.max_bytes:
+            self._reject(f"File is larger than {filesizeformat(self.max_bytes)}.")
+
+        self.spool = SpooledUpload(settings.UPLOAD_SPOOL_MAX_MEMORY)
+        self.digest = hashlib.sha256()
+        self.parser = ImageFile.Parser()
+        self.image_size = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self._reject(f"File is larger than {filesizeformat(self.max_bytes)}.")
+        if self.image_size is None:
+            self._sniff(raw_data, start)
+        self.digest.update(raw_data)
+        self.spool.write(raw_data)
+
+    def _sniff(self, raw_data, start):
+        # Fed until the header parses: EXIF/ICC/XMP segments can push a JPEG's
+        # frame header far into the file, and max_bytes bounds the buffering.
+        # Files that never yield one are rejected in file_complete().
+        try:
+            self.parser.feed(raw_data)
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            self._reject("Upload a valid image.")
+        if self.parser.image is not None:
+            width, height = self.image_size = self.parser.image.size
+            if width * height > self.max_pixels:
+                self._reject(f"Image is {width}×{height}; the limit is {self.max_pixels:,} pixels.")
+
+    def _reject(self, message):
+        self._discard(message)
+        raise SkipFile()
+
+    def _discard(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+
+    def file_complete(self, file_size):
+        if self.spool is None:
+            return None
+        if self.image_size is None:
+            # Too small or malformed for Pillow to find a complete header.
+            self._discard("Upload a valid image.")
+            return None
+        self.spool.file.seek(0)
+        return HashedUploadedFile(
+            self.spool,
+            self.file_name,
+            self.content_type,
+            file_size,
+            self.charset,
+            self.content_type_extra,
+            sha256=self.digest.hexdigest(),
+            image_size=self.image_size,
+        )
+
+    def upload_interrupted(self):
+        if getattr(self, 'spool', None) is not None:
+            self.spool.close()
+            self.spool = None
@@ -0,0 +1,199 @@
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+from .images import build_derivatives, derivative_names, perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+
+class UploadCancelled(Exception):
+    """A sibling upload failed, so this one stopped early."""
+
+
+def pending_files(instance):
+    """Image fields of `instance` holding files not yet in storage."""
+    return {
+        name: getattr(instance, name)
+        for name in instance.IMAGE_FIELDS
+        if getattr(instance, name) and not getattr(instance, name)._committed
+    }
+
+
+def discard(storage, names):
+    """Best-effort release of files stored for a booking that was not saved."""
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception("Could not discard %s", name)
+
+
+def discard_rolled_back(storage, names):
+    """
+    discard() for files stored inside a transaction that rolled back. Their
+    StoredBlob rows went with it, so only blobs no row tracks are ours to
+    delete; a tracked one was a dedup hit whose increment never happened.
+    """
+    from .models import StoredBlob
+    from .storage import ContentAddressedStorage
+
+    if isinstance(storage, ContentAddressedStorage):
+        tracked = set(StoredBlob.objects.filter(name__in=names).values_list('name', flat=True))
+        names = [name for name in names if name not in tracked]
+        storage = storage.inner
+    discard(storage, names)
+
+
+def _stored_by_save(instance, pending):
+    """Names FileField.pre_save and the derivative receiver stored during save()."""
+    names = []
+    for name, fieldfile in pending.items():
+        if fieldfile._committed:
+            names.append(fieldfile.name)
+        names += derivative_names({name: (instance.derivatives or {}).get(name) or {}})
+    return names
+
+
+def _store_one(fieldfile, cancelled):
+    """
+    Upload one file and its derivatives; runs in a worker thread.
+    Returns (derivatives entry or None, stored names). Cleans up after
+    itself if it fails or is cancelled part way.
+    """
+    stored = []
+    try:
+        if cancelled.is_set():
+            raise UploadCancelled
+        source = fieldfile.file
+        fieldfile.save(fieldfile.name, source, save=False)
+        stored.append(fieldfile.name)
+        phash_field = getattr(fieldfile.instance, 'PHASH_FIELDS', {}).get(fieldfile.field.name)
+        if phash_field:
+            setattr(fieldfile.instance, phash_field, perceptual_hash(source))
+
+        if cancelled.is_set():
+            raise UploadCancelled
+        try:
+            derivatives = build_derivatives(fieldfile, source=source)
+        except OSError:
+            # Same as the post_save path: templates fall back to the original
+            logger.exception("Could not build derivatives for %s", fieldfile.name)
+            derivatives = None
+        else:
+            stored += derivative_names({fieldfile.field.name: derivatives})
+        return derivatives, stored
+    except BaseException:
+        discard(fieldfile.storage, stored)
+        raise
+    finally:
+        # Worker threads get their own DB connections (StoredBlob rows)
+        connections.close_all()
+
+
+def _can_parallelise(pending):
+    # Worker threads use separate connections, which cannot see (and on
+    # SQLite would block on) an open transaction of the calling thread.
+    return len(pending) > 1 and settings.PARALLEL_UPLOADS and not connection.in_atomic_block
+
+
+def _collect(instance, pending, outcomes):
+    """Apply per-field results; on any failure release the rest and re-raise."""
+    stored, error = [], None
+    for name, outcome in zip(pending, outcomes):
+        if isinstance(outcome, BaseException):
+            if error is None or isinstance(error, UploadCancelled):
+                error = outcome
+            continue
+        derivatives, names = outcome
+        stored += names
+        if derivatives:
+            instance.derivatives = {**(instance.derivatives or {}), name: derivatives}
+
+    if error is not None:
+        discard(next(iter(pending.values())).storage, stored)
+        raise error
+    return stored
+
+
+def store_files(instance):
+    """
+    Upload the new image files of `instance` (and their thumbnails)
+    concurrently, one worker per field. If one fails the others stop at
+    their next step and everything already stored is released.
+
+    Returns the stored names so the caller can discard them if the row
+    itself does not get saved; [] when nothing was done here (single file,
+    PARALLEL_UPLOADS off, or inside a transaction) and save() uploads as usual.
+    """
+    pending = pending_files(instance)
+    if not _can_parallelise(pending):
+        return []
+
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+        # copy_context: storage timings still count towards this request's metrics
+        futures = [
+            pool.submit(contextvars.copy_context().run, _store_one, fieldfile, cancelled)
+            for fieldfile in pending.values()
+        ]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        if any(future.exception() for future in done):
+            cancelled.set()
+    outcomes = [future.exception() or future.result() for future in futures]
+    return _collect(instance, pending, outcomes)
+
+
+async def astore_files(instance):
+    """store_files() for async views: awaits the uploads off the event loop."""
+    pending = pending_files(instance)
+    if not _can_parallelise(pending):
+        return []
+
+    cancelled = threading.Event()
+    tasks = [
+        asyncio.ensure_future(sync_to_async(_store_one, thread_sensitive=False)(fieldfile, cancelled))
+        for fieldfile in pending.values()
+    ]
+    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    if any(task.exception() for task in done):
+        cancelled.set()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    return _collect(instance, pending, outcomes)
+
+
+def save_with_uploads(instance):
+    """
+    Save a new booking: upload its files concurrently, then insert the row
+    in a transaction. Files are released again if the insert fails
+    (e.g. capacity.CapacityFull), including those save() itself uploaded
+    when store_files() fell back to the sequential path.
+    """
+    stored = store_files(instance)
+    _save_or_discard(instance, stored)
+
+
+async def asave_with_uploads(instance):
+    stored = await astore_files(instance)
+    await sync_to_async(_save_or_discard)(instance, stored)
+
+
+def _save_or_discard(instance, stored):
+    # Files store_files() left for save() to upload (the sequential path)
+    pending = pending_files(instance)
+    try:
+        with transaction.atomic():
+            instance.save()
+    except BaseException:
+        storage = instance._meta.get_field(instance.IMAGE_FIELDS[0]).storage
+        if stored:
+            discard(storage, stored)
+        if pending:
+            discard_rolled_back(storage, _stored_by_save(instance, pending))
+        raise
@@ -7,7 +7,8 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('gallery/', views.gallery_view, name='gallery'),
     path('about/', views.about_view, name='about'),
-    path('book/', views.book_view, name='book'),
+    path('book/', views.book_view_async if settings.ASYNC_BOOKING else views.book_view, name='book'),
+    path('availability/', views.availability_view, name='availability'),
     path('login/', views.login_view, name='login'),
     path('signup/', views.signup_view, name='signup'),
     path('logout/', views.logout_view, name='logout'),
@@ -17,6 +18,11 @@ urlpatterns = [
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('accept/<int:pk>/', views.accept_booking, name='accept_booking'),
     path('deny/<int:pk>/', views.deny_booking, name='deny_booking'),
+    path('bulk-action/', views.bulk_booking_action, name='bulk_booking_action'),
+    path('search/', views.search_view, name='search'),
+    path('export/<str:kind>/', views.export_view, name='export'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('cron/', views.cron_view, name='cron'),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
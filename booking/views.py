@@ -1,104 +1,350 @@
+import calendar
+import hashlib
+import hmac
+import logging
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .forms import AppointmentForm
+from .forms import AppointmentForm, DashboardFilterForm
 from .models import Appointment, CustomUser
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from django.views.decorators.http import require_GET, require_POST, condition
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from .models import UploadedArt
-from django.contrib import admin
+from .pagination import KeysetPaginator, InvalidCursor
+from .uploadhandlers import CappedImageUploadHandler
+from .jobs import enqueue, run_pending
+from .caching import get_latest_booking
+from .conditional import conditional_page
+from . import archive, capacity, conditional, exports, gallery, metrics, notifications, phash, search, uploads
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
 
 
 # ===============================
 # CUSTOMER BOOKING
 # ===============================
+@csrf_exempt
 def book_view(request):
+    # Upload handlers must be swapped before anything reads request.POST,
+    # including the CSRF check, hence the exempt/protect pair.
+    request.upload_handlers = [CappedImageUploadHandler(request)]
+    return _book_view(request)
+
+
+@csrf_protect
+def _book_view(request):
     if request.method == 'POST':
         if not request.user.is_authenticated:
             messages.error(request, "Please log in before booking.")
             return redirect('login')
 
-        # Use the form with POST and FILES data
-        form = AppointmentForm(request.POST, request.FILES)
-        
-        # Debug: Print what we received
-        print(f"DEBUG - Files in request.FILES:")
-        print(f"  art_image: {request.FILES.get('art_image')}")
-        print(f"  payment_reference: {request.FILES.get('payment_reference')}")
-        print(f"DEBUG - Form is valid: {form.is_valid()}")
-        if not form.is_valid():
-            print(f"DEBUG - Form errors: {form.errors}")
-        
-        if form.is_valid():
-            appointment = form.save(commit=False)
-            appointment.user = request.user
-            appointment.status = 'Pending'
-            appointment.save()
-            
-            print(f"DEBUG - Appointment saved:")
-            print(f"  ID: {appointment.id}")
-            print(f"  art_image: {appointment.art_image}")
-            print(f"  payment_reference: {appointment.payment_reference}")
-
-            messages.success(request, "Booking submitted! Wait for admin approval.")
-            return redirect('gallery')
-        else:
-            messages.error(request, "Error submitting booking. Please check your inputs.")
-            print(f"Form errors: {form.errors}")
+        form, appointment = _bound_booking(request)
+        if appointment is not None:
+            try:
+                # Both images (and thumbnails) upload concurrently
+                uploads.save_with_uploads(appointment)
+            except capacity.CapacityFull:
+                return _booking_full(request, form)
+            return _booking_saved(request, appointment)
     else:
         form = AppointmentForm()
 
     return render(request, 'booking/book.html', {'form': form})
 
 
+@csrf_exempt
+async def book_view_async(request):
+    """book_view for ASGI (settings.ASYNC_BOOKING): uploads are awaited, not blocking a worker."""
+    request.upload_handlers = [CappedImageUploadHandler(request)]
+    # Parse (and spool) the multipart body in a thread, off the event loop
+    await sync_to_async(lambda: request.POST)()
+    return await _book_view_async(request)
+
+
+@csrf_protect
+async def _book_view_async(request):
+    if request.method != 'POST':
+        return await sync_to_async(render)(request, 'booking/book.html', {'form': AppointmentForm()})
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        messages.error(request, "Please log in before booking.")
+        return redirect('login')
+
+    form, appointment = await sync_to_async(_bound_booking)(request)
+    if appointment is None:
+        return await sync_to_async(render)(request, 'booking/book.html', {'form': form})
+    try:
+        await uploads.asave_with_uploads(appointment)
+    except capacity.CapacityFull:
+        return await sync_to_async(_booking_full)(request, form)
+    return _booking_saved(request, appointment)
+
+
+def _bound_booking(request):
+    """Validate a booking POST; returns (form, unsaved Appointment or None)."""
+    form = AppointmentForm(request.POST, request.FILES)
+    for field, error in getattr(request, 'upload_errors', {}).items():
+        form.add_error(field, error)
+
+    if not form.is_valid():
+        messages.error(request, "Error submitting booking. Please check your inputs.")
+        logger.info("Booking form rejected: %s", form.errors.as_json())
+        return form, None
+
+    appointment = form.save(commit=False)
+    appointment.user = request.user
+    appointment.status = 'Pending'
+    return form, appointment
+
+
+def _booking_full(request, form):
+    form.add_error('date', "Sorry, that date just filled up. Please pick another day.")
+    messages.error(request, "Error submitting booking. Please check your inputs.")
+    return render(request, 'booking/book.html', {'form': form})
+
+
+def _booking_saved(request, appointment):
+    logger.info(
+        "Booking %s saved (art_image=%s, payment_reference=%s)",
+        appointment.id, appointment.art_image, appointment.payment_reference,
+    )
+    messages.success(request, "Booking submitted! Wait for admin approval.")
+    return redirect('gallery')
+
+
+def _month_dates(request):
+    try:
+        first = datetime.strptime(request.GET.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        first = timezone.localdate().replace(day=1)
+    days = calendar.monthrange(first.year, first.month)[1]
+    return [first + timedelta(days=i) for i in range(days)]
+
+
+def _availability_etag(request):
+    dates = _month_dates(request)
+    key = f"{dates[0]:%Y-%m}|{request.GET.get('artstyle', '')}|{capacity.version(dates)}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+@require_GET
+@condition(etag_func=_availability_etag)
+def availability_view(request):
+    """Month of per-day booking availability for the date picker (JSON)."""
+    dates = _month_dates(request)
+    artstyle = request.GET.get('artstyle') or None
+    limits = capacity.limits_for(dates, artstyle)
+    counts = capacity.counts_for(dates, artstyle)
+
+    days = {}
+    for day in dates:
+        keys = [k for k in ('', artstyle) if k is not None and k in limits[day]]
+        remaining = min((limits[day][k] - counts[day].get(k, 0) for k in keys), default=None)
+        days[day.isoformat()] = {
+            'booked': counts[day].get(artstyle or '', 0),
+            'remaining': None if remaining is None else max(remaining, 0),
+            'available': remaining is None or remaining > 0,
+        }
+
+    response = JsonResponse({'month': f"{dates[0]:%Y-%m}", 'days': days})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
 # ===============================
 # ADMIN DASHBOARD
 # ===============================
 @login_required
+@conditional_page('admin_dashboard', ['admin', 'user'], shows_messages=True)
 def admin_dashboard(request):
     if not (request.user.is_superuser or getattr(request.user, "role", None) == "admin"):
         messages.error(request, "You are not authorized to access this page.")
         return redirect('gallery')
 
-    appointments = Appointment.objects.all().order_by('-created_at')
-    return render(request, 'booking/admin_dashboard.html', {'appointments': appointments})
+    filter_form = DashboardFilterForm(request.GET or None)
+    appointments = filter_form.filter(Appointment.objects.all())
+
+    paginator = KeysetPaginator(appointments, per_page=settings.DASHBOARD_PAGE_SIZE)
+    try:
+        page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+    except InvalidCursor:
+        page = paginator.page()
+
+    # Carry the active filters over to the next/previous links.
+    filter_query = request.GET.copy()
+    filter_query.pop('after', None)
+    filter_query.pop('before', None)
+    phash.flag_reused_payments(page.object_list)
+
+    return render(request, 'booking/admin_dashboard.html', {
+        'appointments': page,
+        'page': page,
+        'filter_form': filter_form,
+        'filter_query': filter_query.urlencode(),
+    })
 
 
-@login_required
-def accept_booking(request, pk):
-    appointment = get_object_or_404(Appointment, pk=pk)
-    
-    # Check if already exists to avoid duplicates
-    existing = UploadedArt.objects.filter(
-        client_name=appointment.fullname,
-        contact=appointment.contact
-    ).first()
-    
-    if not existing and (appointment.art_image or appointment.payment_reference):
-        # Create the UploadedArt entry with the image files
-        UploadedArt.objects.create(
-            client_name=appointment.fullname,
-            contact=appointment.contact,
-            art=appointment.art_image,  # This will copy the file
-            reference=appointment.payment_reference  # This will copy the file
+def _hot_appointment(request, pk):
+    """
+    The live booking `pk`, or None after telling the admin it was archived
+    (e.g. acting from a dashboard tab opened before archive_appointments ran).
+    """
+    appointment = archive.get_appointment(pk)
+    if appointment is None:
+        raise Http404("No such booking.")
+    if appointment.archived:
+        messages.info(
+            request, f"{appointment.fullname}'s booking was archived "
+            f"({appointment.status.lower()}) and can no longer be changed.",
         )
-        print(f"DEBUG - Created UploadedArt for {appointment.fullname}")
-    
-    # Update status after creating UploadedArt
-    appointment.status = 'Accepted'
-    appointment.save()
+        return None
+    return appointment
 
-    messages.success(request, f"{appointment.fullname}'s booking has been accepted and added to the gallery.")
+
+@login_required
+def accept_booking(request, pk):
+    appointment = _hot_appointment(request, pk)
+    if appointment is None:
+        return redirect('admin_dashboard')
+
+    # Conditional update: of concurrent accepts (two admins, a double click)
+    # exactly one flips the row and enqueues promotion. Both statuses hold a
+    # capacity slot, so skipping the save() signals changes no counters.
+    with transaction.atomic():
+        accepted = Appointment.objects.filter(pk=pk, status='Pending').update(status='Accepted')
+        if accepted:
+            appointment.status = 'Accepted'
+            # Gallery promotion and the customer email happen in workers
+            # (manage.py run_jobs / send_notifications)
+            enqueue('promote_to_gallery', {'appointment_id': appointment.pk}, key=f"promote:{appointment.pk}")
+            notifications.queue_status_emails([appointment])
+            conditional.bump('admin', conditional.user_scope(appointment.user_id))
+
+    if not accepted:
+        appointment.refresh_from_db(fields=['status'])
+        messages.info(request, f"{appointment.fullname}'s booking is already {appointment.status.lower()}.")
+        return redirect('admin_dashboard')
+
+    messages.success(request, f"{appointment.fullname}'s booking has been accepted and will be added to the gallery.")
     return redirect('admin_dashboard')
 
 @login_required
 def deny_booking(request, pk):
-    appointment = get_object_or_404(Appointment, pk=pk)
-    appointment.status = 'Denied'
-    appointment.save()
+    if _hot_appointment(request, pk) is None:
+        return redirect('admin_dashboard')
+    with transaction.atomic():
+        appointment = get_object_or_404(Appointment.objects.select_for_update(), pk=pk)
+        if appointment.status != 'Denied':
+            appointment.status = 'Denied'
+            appointment.save()
+            notifications.queue_status_emails([appointment])
     return redirect('admin_dashboard')
 
 
+BULK_ACTIONS = {'accept': 'Accepted', 'deny': 'Denied'}
+
+
+@login_required
+@require_POST
+def bulk_booking_action(request):
+    """Accept or deny many pending bookings at once; reports an outcome per id."""
+    if not (request.user.is_superuser or getattr(request.user, "role", None) == "admin"):
+        messages.error(request, "You are not authorized to access this page.")
+        return redirect('gallery')
+
+    new_status = BULK_ACTIONS.get(request.POST.get('action'))
+    requested = sorted({int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()})
+    ids, over_limit = set(requested[:settings.BULK_ACTION_LIMIT]), requested[settings.BULK_ACTION_LIMIT:]
+    if new_status is None or not ids:
+        messages.error(request, "Select at least one booking and an action.")
+        return redirect('admin_dashboard')
+
+    with transaction.atomic():
+        rows = {
+            a.pk: a for a in Appointment.objects.select_for_update().filter(pk__in=ids)
+        }
+        pending = [a for a in rows.values() if a.status == 'Pending']
+        Appointment.objects.filter(pk__in=[a.pk for a in pending], status='Pending').update(status=new_status)
+        if new_status == 'Denied':
+            capacity.release_many(pending)
+        for appointment in pending:
+            appointment.status = new_status
+        if new_status == 'Accepted':
+            gallery.promote_to_gallery(pending)
+        notifications.queue_status_emails(pending)
+        conditional.bump('admin', *(conditional.user_scope(a.user_id) for a in pending))
+
+    results = {}
+    for pk in sorted(ids):
+        if pk not in rows:
+            results[pk] = 'not found'
+        elif rows[pk] in pending:
+            results[pk] = new_status.lower()
+        else:
+            results[pk] = f"skipped (already {rows[pk].status.lower()})"
+    for pk in over_limit:
+        results[pk] = f"skipped (over the limit of {settings.BULK_ACTION_LIMIT} per action)"
+
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({'results': results})
+
+    messages.success(request, f"{len(pending)} booking(s) {new_status.lower()}.")
+    skipped = [f"#{pk}: {outcome}" for pk, outcome in results.items() if outcome != new_status.lower()]
+    if skipped:
+        more = f" and {len(skipped) - 10} more" if len(skipped) > 10 else ""
+        messages.warning(request, "Not changed — " + "; ".join(skipped[:10]) + more)
+    return redirect('admin_dashboard')
+
+
+@login_required
+@require_GET
+def search_view(request):
+    """Ranked search over bookings and gallery uploads (admins only)."""
+    if not (request.user.is_superuser or getattr(request.user, "role", None) == "admin"):
+        messages.error(request, "You are not authorized to access this page.")
+        return redirect('gallery')
+
+    query = request.GET.get('q', '').strip()
+    page_number = request.GET.get('page', '1')
+    page = search.search(
+        query,
+        page=int(page_number) if page_number.isdigit() else 1,
+        per_page=settings.SEARCH_PAGE_SIZE,
+    )
+
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'query': query,
+            'page': page.number,
+            'has_next': page.has_next,
+            'results': [
+                {
+                    'kind': hit.kind,
+                    'id': hit.obj.pk,
+                    'name': hit.obj.fullname if hit.kind == 'appointment' else hit.obj.client_name,
+                    'contact': hit.obj.contact,
+                    'status': getattr(hit.obj, 'status', None),
+                    'rank': round(hit.rank, 4),
+                }
+                for hit in page
+            ],
+        })
+
+    return render(request, 'booking/search.html', {'query': query, 'page': page})
+
+
 # ===============================
 # AUTHENTICATION VIEWS
 # ===============================
@@ -120,7 +366,7 @@ def signup_view(request):
             messages.error(request, "Passwords do not match.")
             return render(request, 'booking/signup.html')
 
-        if CustomUser.objects.filter(email=email).exists():
+        if CustomUser.objects.filter(email__iexact=email).exists():
             messages.error(request, "Email is already registered.")
             return render(request, 'booking/signup.html')
 
@@ -149,34 +395,27 @@ def signup_view(request):
     return render(request, 'booking/signup.html')
 
 
+def _landing_page(user):
+    if user.is_superuser or getattr(user, "role", None) == "admin":
+        return 'admin_dashboard'
+    return 'gallery'
+
+
 def login_view(request):
     if request.user.is_authenticated:
-        if request.user.is_superuser or getattr(request.user, "role", None) == "admin":
-            return redirect('admin_dashboard')
-        else:
-            return redirect('gallery')
+        return redirect(_landing_page(request.user))
 
     if request.method == 'POST':
         username_or_email = request.POST.get('username', '').strip()
         password = request.POST.get('password', '')
 
+        # EmailOrUsernameBackend accepts either, with a single password hash
         user = authenticate(request, username=username_or_email, password=password)
 
-        if user is None:
-            try:
-                user_obj = CustomUser.objects.get(email=username_or_email)
-                user = authenticate(request, username=user_obj.username, password=password)
-            except CustomUser.DoesNotExist:
-                user = None
-
         if user is not None:
             login(request, user)
             messages.success(request, f"Welcome back, {user.first_name or user.username}!")
-
-            if user.is_superuser or getattr(user, "role", None) == "admin":
-                return redirect('admin_dashboard')
-            else:
-                return redirect('gallery')
+            return redirect(_landing_page(user))
         else:
             messages.error(request, "Invalid username/email or password.")
 
@@ -194,12 +433,14 @@ def logout_view(request):
 # MAIN SITE PAGES
 # ===============================
 @login_required(login_url='login')
+@conditional_page('gallery', ['user'])
 def gallery_view(request):
     """Home page (Customer Gallery)"""
-    latest_booking = Appointment.objects.filter(user=request.user).order_by('-created_at').first()
+    latest_booking = get_latest_booking(request)
     return render(request, 'booking/gallery.html', {'latest_booking': latest_booking})
 
 
+@conditional_page('about', ['user'])
 def about_view(request):
     """About page"""
     return render(request, 'booking/about.html')
@@ -209,12 +450,15 @@ def about_view(request):
 # ROOT REDIRECT (on server start)
 # ===============================
 def home_redirect(request):
+    # Signed-in users keep their session (logging them out here rewrote the
+    # session row on every visit to the site root)
     if request.user.is_authenticated:
-        logout(request)
+        return redirect(_landing_page(request.user))
     return redirect('login')
 
 
 @login_required
+@conditional_page('admin_gallery', ['admin', 'user'])
 def admin_gallery(request):
     """Admin Gallery View – show all uploads and pending bookings"""
     if not (request.user.is_superuser or getattr(request.user, "role", None) == "admin"):
@@ -222,7 +466,9 @@ def admin_gallery(request):
         return redirect('gallery')
     
     uploads = UploadedArt.objects.all().order_by('-date_uploaded')
-    appointments = Appointment.objects.exclude(status='Accepted').order_by('-created_at')
+    appointments = phash.flag_reused_payments(
+        list(Appointment.objects.exclude(status='Accepted').order_by('-created_at'))
+    )
 
     return render(request, 'booking/admin_gallery.html', {
         'uploads': uploads,
@@ -230,6 +476,62 @@ def admin_gallery(request):
     })
 
 
-@admin.register(UploadedArt)
-class UploadedArtAdmin(admin.ModelAdmin):
-    list_display = ('client_name', 'date_uploaded')
\ No newline at end of file
+@login_required
+def export_view(request, kind):
+    """Stream appointments or gallery records as CSV/JSONL (admins only).
+
+    Takes the dashboard filters plus ?format=csv|jsonl.
+    """
+    if not (request.user.is_superuser or getattr(request.user, "role", None) == "admin"):
+        messages.error(request, "You are not authorized to access this page.")
+        return redirect('gallery')
+    if kind not in exports.FIELDS:
+        raise Http404("Unknown export")
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest("format must be csv or jsonl")
+    try:
+        rows = exports.export_rows(kind, request.GET)
+    except exports.InvalidFilters as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    response = StreamingHttpResponse(exports.serialise(kind, fmt, rows), content_type=exports.FORMATS[fmt])
+    filename = f"{kind}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def metrics_view(request):
+    """Prometheus text exposition of RequestMetricsMiddleware data (admins only)."""
+    if not (request.user.is_superuser or getattr(request.user, "role", None) == "admin"):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ===============================
+# SCHEDULED WORK (Vercel Cron)
+# ===============================
+@require_GET
+def cron_view(request):
+    """
+    Drain due background jobs, then queued emails, for at most
+    CRON_TIME_BUDGET seconds; what is left waits for the next tick. Vercel
+    Cron calls this with "Authorization: Bearer $CRON_SECRET" (vercel.json).
+    Long-running hosts can use manage.py run_jobs / send_notifications.
+    """
+    expected = f"Bearer {settings.CRON_SECRET}"
+    if not settings.CRON_SECRET or not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+        return HttpResponseForbidden()
+
+    deadline = time.monotonic() + settings.CRON_TIME_BUDGET
+    jobs = sent = failed = 0
+    while time.monotonic() < deadline and run_pending(limit=1):
+        jobs += 1
+    while time.monotonic() < deadline:
+        batch_sent, batch_failed = notifications.deliver_batch()
+        if not (batch_sent or batch_failed):
+            break
+        sent, failed = sent + batch_sent, failed + batch_failed
+    return JsonResponse({'jobs': jobs, 'emails_sent': sent, 'emails_failed': failed})
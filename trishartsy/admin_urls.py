@@ -0,0 +1,12 @@
+"""
+Admin URLconf, imported only when a request or reverse() first needs it.
+
+With LAZY_STARTUP the admin app is installed via SimpleAdminConfig, so
+admin.py modules are discovered here instead of during django.setup().
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+app_name = 'admin'
+urlpatterns = admin.site.get_urls()
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trishartsy.settings')
+# Under ASGI, serve /book/ with the async view (concurrent, awaited uploads)
+os.environ.setdefault('ASYNC_BOOKING', 'True')
 
 application = get_asgi_application()
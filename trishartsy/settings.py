@@ -4,6 +4,7 @@ Final Production Version for Vercel + Neon + Cloudinary.
 """
 
 from pathlib import Path
+import importlib.util
 import os
 import dj_database_url
 
@@ -45,19 +46,37 @@ INSTALLED_APPS = [
     'booking',
 ]
 
+# Serverless cold starts: skip admin autodiscovery (done on first /admin/ hit,
+# see trishartsy/admin_urls.py), leave out the Cloudinary apps (only template
+# tags/commands; the storage backend imports the SDK on first media access)
+# and defer WhiteNoise's static scan to the first /static/ request.
+LAZY_STARTUP = os.environ.get('LAZY_STARTUP', 'True' if os.environ.get('VERCEL') else 'False') == 'True'
+
+if LAZY_STARTUP:
+    INSTALLED_APPS = [
+        'django.contrib.admin.apps.SimpleAdminConfig' if app == 'django.contrib.admin' else app
+        for app in INSTALLED_APPS
+        if app not in ('cloudinary_storage', 'cloudinary')
+    ]
+
+# Fails `manage.py profile_startup --enforce` when exceeded
+COLD_START_BUDGET_MS = int(os.environ.get('COLD_START_BUDGET_MS', 1500))
+
 
 # ===============================
 # MIDDLEWARE
 # ===============================
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # MUST be second
+    'booking.middleware.LazyWhiteNoiseMiddleware' if LAZY_STARTUP
+    else 'whitenoise.middleware.WhiteNoiseMiddleware',  # MUST be second
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',  
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'booking.middleware.RequestMetricsMiddleware',
 ]
 
 
@@ -93,14 +112,93 @@ TEMPLATES = [
 # ===============================
 # DATABASE (Neon PostgreSQL)
 # ===============================
+# DB_POOL_MODE (compare with `manage.py bench_db_connections`):
+#   'persistent' - keep the connection for DB_CONN_MAX_AGE and health-check
+#                  it at the start of each request (previous behaviour)
+#   'direct'     - new connection per request
+#   'pgbouncer'  - for a transaction-mode pooler such as Neon's -pooler
+#                  host: no server-side cursors or prepared statements,
+#                  no health checks (the pooler replaces dead backends)
+#   'pool'       - in-process psycopg 3 pool (needs psycopg[pool])
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'persistent')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600,
-        conn_health_checks=True,
+        conn_max_age=DB_CONN_MAX_AGE if DB_POOL_MODE in ('persistent', 'pgbouncer') else 0,
+        conn_health_checks=DB_POOL_MODE == 'persistent',
     )
 }
 
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.postgresql':
+    if DB_POOL_MODE == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+        # psycopg2 never prepares statements; psycopg 3 must be told not to
+        if importlib.util.find_spec('psycopg'):
+            DATABASES['default'].setdefault('OPTIONS', {})['prepare_threshold'] = None
+    elif DB_POOL_MODE == 'pool':
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+
+
+# ===============================
+# CACHE
+# ===============================
+# SESSION_CACHE picks the tier sessions live in: 'locmem' (per process),
+# 'file' (shared by processes on one host) or 'redis' (SESSION_CACHE_URL;
+# any Redis-compatible server, needs the redis package)
+SESSION_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'trishartsy-sessions',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SESSION_CACHE_DIR', '/tmp/trishartsy-sessions'),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('SESSION_CACHE_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'trishartsy',
+    },
+    'sessions': SESSION_CACHE_BACKENDS[os.environ.get('SESSION_CACHE', 'locmem')],
+}
+
+# Per-user latest booking shown in the header/gallery (seconds). Entries
+# are keyed on the user's PageVersion, so this only bounds memory use:
+# a booking change on any instance moves readers to a fresh key.
+LATEST_BOOKING_CACHE_TIMEOUT = 300
+
+# Logged-in user loaded by AuthenticationMiddleware (seconds); dropped
+# whenever the user row is saved or deleted
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+
+
+# ===============================
+# SESSIONS
+# ===============================
+# 'cached_db' reads through SESSION_CACHE and falls back to the database on
+# a miss (a cold serverless instance); 'cache' skips the database entirely
+# and should only be used with a shared tier (file/redis); 'db' is the old
+# behaviour.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_BACKEND', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
 
 # ===============================
 # CLOUDINARY STORAGE CONFIG
@@ -124,26 +222,188 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Use WhiteNoise to find static files in app directories
 WHITENOISE_USE_FINDERS = True
 
+# MEDIA_STORAGE=local keeps media under MEDIA_ROOT (seeding, benchmarks)
+MEDIA_BACKENDS = {
+    'cloudinary': 'cloudinary_storage.storage.MediaCloudinaryStorage',
+    'local': 'django.core.files.storage.FileSystemStorage',
+    'slow': 'booking.storage.LatencyStorage',  # local files + MEDIA_LATENCY_MS per call
+}
+MEDIA_LATENCY_MS = int(os.environ.get('MEDIA_LATENCY_MS', 150))
+
 STORAGES = {
+    # Content-addressed wrapper: identical uploads are stored once
     "default": {
-        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+        "BACKEND": "booking.storage.ContentAddressedStorage",
+        "OPTIONS": {
+            "backend": MEDIA_BACKENDS[os.environ.get('MEDIA_STORAGE', 'cloudinary')],
+        },
+    },
+    # Archived bookings' media (booking.archive); point ARCHIVE_STORAGE at a
+    # cheaper backend, files land under ARCHIVE_MEDIA_PREFIX either way
+    "archive": {
+        "BACKEND": MEDIA_BACKENDS[os.environ.get('ARCHIVE_STORAGE', os.environ.get('MEDIA_STORAGE', 'cloudinary'))],
     },
+    # WhiteNoise's compressed manifest storage + AVIF/WebP image variants
     "staticfiles": {
-        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+        "BACKEND": "booking.storage.ResponsiveStaticFilesStorage",
     },
 }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Booking form uploads (booking.uploadhandlers.CappedImageUploadHandler)
+UPLOAD_LIMITS = {
+    'art_image': {'max_bytes': 8 * 1024 * 1024, 'max_pixels': 40_000_000},
+    'payment_reference': {'max_bytes': 4 * 1024 * 1024, 'max_pixels': 12_000_000},
+    'default': {'max_bytes': 4 * 1024 * 1024, 'max_pixels': 12_000_000},
+}
+UPLOAD_SPOOL_MAX_MEMORY = 256 * 1024  # larger uploads spool to a temp file
+
+# Push a booking's two images to storage concurrently (booking.uploads)
+PARALLEL_UPLOADS = os.environ.get('PARALLEL_UPLOADS', 'True') == 'True'
+# Route /book/ to the async view; trishartsy/asgi.py turns this on
+ASYNC_BOOKING = os.environ.get('ASYNC_BOOKING', 'False') == 'True'
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR')  # None = system temp (/tmp on Vercel)
+
+# Re-encoding applied to booking uploads before they are stored
+IMAGE_INGEST = {
+    'art_image': {'max_dimension': 2048, 'fmt': 'WEBP', 'quality': 85},
+    'payment_reference': {'max_dimension': 1600, 'fmt': 'WEBP', 'quality': 75},
+}
+
+# Downscaled copies generated for every uploaded ImageField (label: max width px)
+IMAGE_DERIVATIVES = {
+    'thumb': 320,
+    'medium': 960,
+}
+IMAGE_DERIVATIVE_FORMAT = 'WEBP'
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Static images collectstatic renders in these widths/formats for
+# {% static_picture %}; formats this Pillow build cannot write are skipped.
+# Photos only: lossy re-encoding would soften the GCash QR code.
+STATIC_IMAGE_PATTERNS = ['images/*.jpg', 'images/*.jpeg']
+STATIC_IMAGE_WIDTHS = [480, 960, 1440]
+# Format -> quality; AVIF's scale is harsher, 50 looks like WebP at 70.
+STATIC_IMAGE_FORMATS = {'AVIF': 50, 'WEBP': 70}
+
 
 # ===============================
 # AUTHENTICATION
 # ===============================
 AUTH_USER_MODEL = 'booking.CustomUser'
+AUTHENTICATION_BACKENDS = ['booking.backends.EmailOrUsernameBackend']
 LOGIN_URL = '/login/'
 
 
+# ===============================
+# ADMIN DASHBOARD
+# ===============================
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 25))
+BULK_ACTION_LIMIT = 500   # max bookings per bulk accept/deny
+SEARCH_PAGE_SIZE = 25
+# Rows fetched per round trip by /export/ and manage.py export_bookings
+EXPORT_CHUNK_SIZE = 2000
+
+
+# ===============================
+# ARCHIVAL
+# ===============================
+# Finished bookings whose date and creation are older than this many days
+# move to ArchivedAppointment (manage.py archive_appointments)
+ARCHIVE_AFTER_DAYS = {
+    'Denied': int(os.environ.get('ARCHIVE_DENIED_AFTER_DAYS', 30)),
+    'Accepted': int(os.environ.get('ARCHIVE_ACCEPTED_AFTER_DAYS', 180)),
+}
+ARCHIVE_MEDIA_PREFIX = 'archive/'
+ARCHIVE_BATCH_SIZE = 500
+
+
+# ===============================
+# CONDITIONAL GET (booking.conditional)
+# ===============================
+# Part of every page ETag: changing it (each Vercel deploy does) makes
+# browsers re-fetch pages after template or static changes
+PAGE_VERSION_SALT = os.environ.get('PAGE_VERSION_SALT') or os.environ.get('VERCEL_GIT_COMMIT_SHA', '')
+
+
+# ===============================
+# REUSED PAYMENT SCREENSHOTS (booking.phash)
+# ===============================
+# Screenshots whose perceptual hashes differ in at most this many of 64 bits
+# are flagged as a possible reused payment on the admin pages
+PHASH_MAX_DISTANCE = int(os.environ.get('PHASH_MAX_DISTANCE', 4))
+# Seconds before a process rebuilds its in-memory index from the database
+PHASH_INDEX_TTL = 300
+
+
+# ===============================
+# BULK IMPORT (manage.py import_bookings)
+# ===============================
+IMPORT_BATCH_SIZE = 500   # source rows per transaction / checkpoint
+IMPORT_WORKERS = 4        # concurrent image uploads
+
+
+# ===============================
+# BOOKING CAPACITY
+# ===============================
+# Default bookings per day when no CapacityLimit row applies (0 = unlimited)
+BOOKING_DAILY_LIMIT = int(os.environ.get('BOOKING_DAILY_LIMIT', 0))
+
+
+# ===============================
+# BACKGROUND JOBS (manage.py run_jobs)
+# ===============================
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 30        # seconds, doubled per attempt
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_LOCK_TIMEOUT = 600        # reclaim jobs from workers that died mid-run
+
+# Vercel has no long-running worker: the cron in vercel.json calls /cron/
+# (booking.views.cron_view) with this secret, which Vercel sends as a bearer
+# token. The endpoint is disabled while it is unset.
+CRON_SECRET = os.environ.get('CRON_SECRET', '')
+CRON_TIME_BUDGET = int(os.environ.get('CRON_TIME_BUDGET', 8))   # seconds; keep under the function timeout
+
+
+# ===============================
+# EMAIL NOTIFICATIONS (manage.py send_notifications)
+# ===============================
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'TrishArtSy <webmaster@localhost>')
+
+NOTIFICATION_BATCH_SIZE = 50      # messages sent per SMTP connection
+NOTIFICATION_MAX_ATTEMPTS = 5     # retried with the JOB_RETRY_BACKOFF schedule
+
+
+# ===============================
+# OBSERVABILITY (booking.middleware.RequestMetricsMiddleware)
+# ===============================
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
+N_PLUS_ONE_THRESHOLD = 10   # same query shape this many times in one request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'booking': {
+            'handlers': ['console'],
+            'level': os.environ.get('BOOKING_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+
 # ===============================
 # INTERNATIONALIZATION
 # ===============================
@@ -1,14 +1,16 @@
-from django.contrib import admin
 from django.urls import path, include
+from django.urls.resolvers import RoutePattern, URLResolver
 from booking import views  # import views to use home_redirect
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('', views.home_redirect, name='home'),  # redirects root to login
-    path('admin/', admin.site.urls),
+    # Unlike include(), a URLResolver given a module path imports it on
+    # first use, keeping django.contrib.admin off the cold-start path.
+    URLResolver(RoutePattern('admin/'), 'trishartsy.admin_urls', app_name='admin', namespace='admin'),
     path('', include('booking.urls')),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)